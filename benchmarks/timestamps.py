@@ -0,0 +1,55 @@
+"""Compare the provider timestamp parsers with the pendulum calls they replace.
+
+Run with `python -m benchmarks.timestamps` from the repository root.
+"""
+import timeit
+
+import pendulum
+
+from gooker import timestamps
+
+
+NUMBER = 20000
+CASES = [
+    (
+        "ForeUp",
+        "2026-10-17 06:30",
+        timestamps.parse_local,
+        lambda val: pendulum.from_format(
+            val, "YYYY-MM-DD HH:mm", tz="America/Los_Angeles"
+        ),
+    ),
+    (
+        "EZLinks",
+        "2026-10-17T06:30:00",
+        timestamps.parse_local,
+        lambda val: pendulum.parser.parse(val, tz="America/Los_Angeles"),
+    ),
+    (
+        "TeeItUp",
+        "2026-10-17T13:20:00.000Z",
+        timestamps.parse_utc,
+        lambda val: pendulum.parser.parse(val).in_timezone("America/Los_Angeles"),
+    ),
+]
+
+
+def _usec(fn, val) -> float:
+    return timeit.timeit(lambda: fn(val), number=NUMBER) / NUMBER * 1e6
+
+
+def main():
+    print("usec per call")
+    print(f"{'':10}{'pendulum':>10}{'uncached':>10}{'cached':>10}{'speedup':>10}")
+    for name, val, fast, slow in CASES:
+        assert fast(val) == slow(val)
+        baseline = _usec(slow, val)
+        uncached = _usec(fast.__wrapped__, val)
+        cached = _usec(fast, val)
+        print(
+            f"{name:10}{baseline:>10.2f}{uncached:>10.2f}{cached:>10.2f}{baseline / uncached:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
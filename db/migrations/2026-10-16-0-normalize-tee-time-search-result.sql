@@ -0,0 +1,29 @@
+create table tee_time_search_result_normalized (
+  search_id uuid not null,
+  course_name text not null,
+  course_id text not null,
+  -- unix timestamp of the start time
+  tee_time integer not null,
+  num_golfers integer not null,
+  price real not null,
+  primary key (search_id, course_name, tee_time),
+  foreign key (search_id)
+    references tee_time_search (id)
+      on delete cascade
+      on update cascade
+) without rowid;
+
+insert or replace into tee_time_search_result_normalized
+(search_id, course_name, course_id, tee_time, num_golfers, price)
+select
+  search_id,
+  json_extract("tee_time", '$.course.name'),
+  json_extract("tee_time", '$.course.id'),
+  cast(strftime('%s', json_extract("tee_time", '$.tee_time')) as integer),
+  json_extract("tee_time", '$.num_golfers'),
+  json_extract("tee_time", '$.price')
+from tee_time_search_result;
+
+drop table tee_time_search_result;
+
+alter table tee_time_search_result_normalized rename to tee_time_search_result;
@@ -0,0 +1,15 @@
+create table if not exists notification_outbox (
+  id integer primary key,
+  search_id uuid not null,
+  method text not null,
+  destination text_list not null,
+  subject text not null,
+  body text not null,
+  attempts integer not null default 0,
+  -- unix time of the next delivery attempt, null once retries are exhausted
+  next_attempt_at real,
+  last_error text
+);
+
+create index if not exists notification_outbox_next_attempt_at
+  on notification_outbox (next_attempt_at);
@@ -0,0 +1,29 @@
+-- notifications keep their tee times so several can be merged into one
+-- digest per recipient, the body is only set on rows queued before this
+create table notification_outbox_digest (
+  id integer primary key,
+  search_id uuid not null,
+  method text not null,
+  destination text_list not null,
+  subject text not null,
+  body text,
+  -- json list of [course_name, tee_time, num_golfers, price]
+  tee_times text not null default '[]',
+  search_message text not null default '',
+  attempts integer not null default 0,
+  -- unix time of the next delivery attempt, null once retries are exhausted
+  next_attempt_at real,
+  last_error text
+);
+
+insert into notification_outbox_digest
+(id, search_id, method, destination, subject, body, attempts, next_attempt_at, last_error)
+select id, search_id, method, destination, subject, body, attempts, next_attempt_at, last_error
+from notification_outbox;
+
+drop table notification_outbox;
+
+alter table notification_outbox_digest rename to notification_outbox;
+
+create index notification_outbox_next_attempt_at
+  on notification_outbox (next_attempt_at);
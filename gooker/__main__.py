@@ -1,24 +1,46 @@
 import logging
 import asyncio
 import uuid
-import time
-import random
 
 from pendulum.date import Date
 
 from gooker import base
+from gooker import poller
 from gooker import search
+from gooker import transport
 from gooker.args import parse_args
 from gooker.database import DBClient
 from gooker.clients import clients
 
 
-MIN_SLEEP = 60 * 7
-MAX_SLEEP = 60 * 15
-
 logger = logging.getLogger(__name__)
 
 
+async def _find_tee_times(search_params: base.TeeTimeSearchParams):
+    try:
+        return await search.find_tee_times(search_params)
+    finally:
+        await transport.aclose()
+
+
+async def _stream_tee_times(
+    search_params: base.TeeTimeSearchParams,
+) -> list[base.TeeTime]:
+    tee_time_list = []
+    try:
+        async for tee_times in search.iter_tee_times(search_params):
+            for t in sorted(tee_times, key=lambda t: t.tee_time):
+                print(
+                    f"{t.tee_time.format('ddd MMM Do h:mm A')}, {t.course.name}, ${int(t.price)}, {t.num_golfers} players",
+                    flush=True,
+                )
+            tee_time_list.extend(tee_times)
+    finally:
+        await transport.aclose()
+
+    return tee_time_list
+
+
 def main():
     args = parse_args()
     if args.command == "find-tee-times":
@@ -64,7 +86,11 @@ def main():
                     )
                 )
         else:
-            tee_time_list = asyncio.run(search.find_tee_times(tee_time_search))
+            if args.stream:
+                tee_time_list = asyncio.run(_stream_tee_times(tee_time_search))
+                print()
+            else:
+                tee_time_list = asyncio.run(_find_tee_times(tee_time_search))
             tee_times = base.TeeTimes()
             for t in tee_time_list:
                 tee_times.add_tee_time(t)
@@ -75,14 +101,7 @@ def main():
                 print("No tee times found.")
 
     elif args.command == "poll-for-tee-times":
-        while True:
-            sleep_time = random.randint(MIN_SLEEP, MAX_SLEEP)
-            logger.info(
-                f"sleeping for {sleep_time//60} minutes {sleep_time%60} seconds"
-            )
-            time.sleep(sleep_time)
-            with DBClient() as client:
-                asyncio.run(search.check_for_times(client))
+        asyncio.run(poller.poll_for_tee_times())
 
     elif args.command in (
         "create-course-group",
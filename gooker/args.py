@@ -11,7 +11,7 @@ from pendulum.date import Date
 from pendulum.datetime import DateTime
 from pendulum.time import Time
 
-from gooker.clients import clients
+from gooker.clients import registry
 from gooker.database import DBClient
 
 
@@ -93,7 +93,9 @@ def _validate_args(args):
             "remove-from-course-group",
         ):
             with DBClient() as client:
-                coures_group_courses = client.get_course_group(args.course_group)
+                coures_group_courses = registry.get_course_group(
+                    client, args.course_group
+                )
                 if (
                     coures_group_courses is None
                     or len(coures_group_courses) == 1
@@ -138,7 +140,7 @@ def parse_args():
     arg_parser.add_argument(
         "--courses",
         type=str,
-        choices=[course.name for client in clients for course in client.courses],
+        choices=registry.names,
         help="courses to search",
         nargs="*",
     )
@@ -198,6 +200,11 @@ def parse_args():
         action="store_true",
         help="If true, get notified when tee times matching parameters become available",
     )
+    arg_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="print tee times as each provider responds, followed by the full summary",
+    )
     arg_parser.add_argument(
         "--course-group",
         type=str,
@@ -1,5 +1,8 @@
-from typing import Union
+from typing import Awaitable, Callable, Hashable, Union
 from abc import ABC, abstractmethod
+from array import array
+import asyncio
+import logging
 import uuid
 import datetime
 
@@ -8,7 +11,14 @@ from pendulum.date import Date
 from pendulum.datetime import DateTime
 from pendulum.time import Time
 from pydantic import BaseModel, validator
-from httpx import AsyncClient, Timeout
+from httpx import AsyncClient, Response
+
+from gooker import cache
+from gooker import query
+from gooker import transport
+
+
+logger = logging.getLogger(__name__)
 
 
 class Course(BaseModel):
@@ -19,6 +29,10 @@ class Course(BaseModel):
     is_par_70_plus: bool
     booking_info: str
 
+    @property
+    def key(self) -> tuple[str, int | str]:
+        return (self.name, self.id)
+
     def __eq__(self, other):
         return (
             isinstance(other, Course)
@@ -27,6 +41,9 @@ class Course(BaseModel):
             and self.id == other.id
         )
 
+    def __hash__(self):
+        return hash(self.key)
+
 
 class TeeTime(BaseModel):
     course: Course
@@ -37,10 +54,16 @@ class TeeTime(BaseModel):
     @validator("tee_time")
     @classmethod
     def must_be_pendulum_datetime(cls, val):
+        if isinstance(val, DateTime):
+            return val
         if isinstance(val, datetime.datetime):
             return pendulum.instance(val)
         return val
 
+    @property
+    def key(self) -> tuple[str, int]:
+        return (self.course.name, self.tee_time.int_timestamp)
+
     def __eq__(self, other):
         return (
             isinstance(other, TeeTime)
@@ -48,6 +71,203 @@ class TeeTime(BaseModel):
             and self.tee_time == other.tee_time
         )
 
+    def __hash__(self):
+        return hash(self.key)
+
+
+class Slot:
+    """Lightweight tee time used between parsing and the edges of the app.
+
+    Unlike `TeeTime` it skips validation and references the client's `Course`
+    instead of carrying its own copy. Use `to_tee_time` when a model is needed.
+    """
+
+    __slots__ = ("course", "tee_time", "num_golfers", "price")
+
+    course: Course
+    tee_time: DateTime
+    num_golfers: int
+    price: float
+
+    def __init__(
+        self, course: Course, tee_time: DateTime, num_golfers: int, price: float
+    ):
+        self.course = course
+        self.tee_time = tee_time
+        self.num_golfers = int(num_golfers)
+        self.price = float(price)
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return (self.course.name, self.tee_time.int_timestamp)
+
+    def to_tee_time(self) -> TeeTime:
+        return TeeTime.construct(
+            course=self.course,
+            tee_time=self.tee_time,
+            num_golfers=self.num_golfers,
+            price=self.price,
+        )
+
+    def __eq__(self, other):
+        # like TeeTime, only equal to its own kind, compare keys to mix them
+        return isinstance(other, Slot) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Slot({self.course.name!r}, {self.tee_time}, {self.num_golfers}, {self.price})"
+
+
+AnyTeeTime = Union[TeeTime, Slot]
+
+
+class TeeTimeBatch:
+    """Tee times from one fetch stored column-wise.
+
+    Filters run over whole columns instead of building an object per row, and
+    `select_many` checks many searches' filters in a single pass. Rows are
+    turned into `Slot`s only once they've been selected.
+
+    `failed_courses` holds the keys of courses whose tee times couldn't be
+    fetched, so their absence from the batch means nothing.
+    """
+
+    courses: list[Course]
+    course_keys: dict[tuple[str, int | str], int]
+    course_index: array  # index into courses
+    tee_times: list[DateTime]
+    minutes: array  # minutes since midnight
+    players: array
+    price_cents: array
+    failed_courses: set[tuple[str, int | str]]
+
+    def __init__(self):
+        self.courses = []
+        self.course_keys = {}
+        self.course_index = array("H")
+        self.tee_times = []
+        self.minutes = array("H")
+        self.players = array("H")
+        self.price_cents = array("L")
+        self.failed_courses = set()
+
+    def _index_of(self, course: Course) -> int:
+        index = self.course_keys.get(course.key)
+        if index is None:
+            index = self.course_keys[course.key] = len(self.courses)
+            self.courses.append(course)
+        return index
+
+    def append(
+        self, course: Course, tee_time: DateTime, num_golfers: int, price: float
+    ):
+        self.course_index.append(self._index_of(course))
+        self.tee_times.append(tee_time)
+        self.minutes.append(tee_time.hour * 60 + tee_time.minute)
+        self.players.append(int(num_golfers))
+        self.price_cents.append(round(float(price) * 100))
+
+    def extend(self, other: "TeeTimeBatch"):
+        for i in range(len(other)):
+            self._append_row(other, i)
+        self.failed_courses |= other.failed_courses
+
+    def _append_row(self, other: "TeeTimeBatch", i: int):
+        self.course_index.append(self._index_of(other.courses[other.course_index[i]]))
+        self.tee_times.append(other.tee_times[i])
+        self.minutes.append(other.minutes[i])
+        self.players.append(other.players[i])
+        self.price_cents.append(other.price_cents[i])
+
+    def take(self, indices: list[int]) -> "TeeTimeBatch":
+        taken = TeeTimeBatch()
+        taken.failed_courses = set(self.failed_courses)
+        for i in indices:
+            taken._append_row(self, i)
+        return taken
+
+    def __len__(self) -> int:
+        return len(self.tee_times)
+
+    def slot(self, i: int) -> Slot:
+        return Slot(
+            self.courses[self.course_index[i]],
+            self.tee_times[i],
+            self.players[i],
+            self.price_cents[i] / 100,
+        )
+
+    def _bounds(
+        self, tee_time_filter: query.TeeTimeFilter, course_keys: set | None
+    ) -> tuple[int, int, int, float, set[int] | None]:
+        earliest_time = tee_time_filter.earliest_time
+        latest_time = tee_time_filter.latest_time
+        max_price = tee_time_filter.max_price
+        # bounds are exclusive, widened by a minute when the ends are included
+        widen = 1 if tee_time_filter.inclusive else 0
+        return (
+            -1
+            if earliest_time is None
+            else earliest_time.hour * 60 + earliest_time.minute - widen,
+            24 * 60
+            if latest_time is None
+            else latest_time.hour * 60 + latest_time.minute + widen,
+            tee_time_filter.min_players or 0,
+            float("inf") if max_price is None else max_price * 100,
+            None
+            if course_keys is None
+            else {
+                self.course_keys[key] for key in course_keys if key in self.course_keys
+            },
+        )
+
+    def select(
+        self,
+        tee_time_filter: query.TeeTimeFilter,
+        course_keys: set | None = None,
+    ) -> list[int]:
+        """Indices of the rows matching a filter and, if given, a set of courses."""
+        return self.select_many([(tee_time_filter, course_keys)])[0]
+
+    def select_many(
+        self, filters: list[tuple[query.TeeTimeFilter, set | None]]
+    ) -> list[list[int]]:
+        bounds = [self._bounds(f, course_keys) for f, course_keys in filters]
+        selected: list[list[int]] = [[] for _ in bounds]
+        for i, (minute, players, price, course) in enumerate(
+            zip(self.minutes, self.players, self.price_cents, self.course_index)
+        ):
+            for matches, (
+                earliest,
+                latest,
+                min_players,
+                max_price,
+                courses,
+            ) in zip(selected, bounds):
+                if (
+                    earliest < minute < latest
+                    and players >= min_players
+                    and price <= max_price
+                    and (courses is None or course in courses)
+                ):
+                    matches.append(i)
+        return selected
+
+    def filter(self, tee_time_filter: query.TeeTimeFilter) -> "TeeTimeBatch":
+        return self.take(self.select(tee_time_filter))
+
+    def dedupe(self, rows: list[int]) -> list[int]:
+        """One of `rows` per course and start time, the one with the highest price."""
+        best: dict[tuple[int, DateTime], int] = {}
+        for i in rows:
+            key = (self.course_index[i], self.tee_times[i])
+            existing = best.get(key)
+            if existing is None or self.price_cents[i] > self.price_cents[existing]:
+                best[key] = i
+        return sorted(best.values())
+
 
 class TeeTimes(BaseModel):
     tee_times: dict[Date, dict[str, list[TeeTime]]] = {}
@@ -139,28 +359,113 @@ class TeeTimeSearch(BaseModel):
 
 
 class TeeTimeClient(ABC):
-    client: AsyncClient
+    host: transport.Host
     base_url: str
     courses: list[Course]
     default_earliest_time: Time = Time(5, 0)  # 5am
     default_latest_time: Time = Time(19, 0)  # 7pm
+    max_concurrency: int = 16  # max in flight requests per client
+    max_batch_size: int | None = None  # max courses per request, None if unlimited
+    capabilities: query.ProviderCapabilities = query.ProviderCapabilities()
+    course_keys: frozenset[tuple[str, int | str]] = frozenset()
+    courses_by_id: dict[int | str, Course] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "courses" in cls.__dict__:
+            cls.course_keys = frozenset(course.key for course in cls.courses)
+            cls.courses_by_id = {course.id: course for course in cls.courses}
 
     def __init__(self):
-        self.client = AsyncClient(
-            base_url=self.base_url,
-            headers={
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/110.0"
-            },
-            verify=False,
-            timeout=Timeout(120),
-        )
+        self.host = transport.get_host(self.base_url)
+
+    @property
+    def client(self) -> AsyncClient:
+        return self.host.client
 
     async def __aenter__(self):
-        await self.client.__aenter__()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.__aexit__(exc_type, exc_val, exc_tb)
+        pass
+
+    async def request(self, method: str, path: str, **kwargs) -> Response:
+        url = self.base_url + path
+        key = cache.response_cache.make_key(method, url, **kwargs)
+        res = cache.response_cache.get(method, url, key)
+        if res is not None:
+            return res
+
+        res = await self.host.request(method, url, **kwargs)
+        if res.is_success:
+            cache.response_cache.set(key, res)
+        return res
+
+    def plan_query(
+        self,
+        earliest_time: Time | None,
+        latest_time: Time | None,
+        min_players: int,
+        max_price: int | None,
+    ) -> tuple[query.ProviderQuery, query.TeeTimeFilter]:
+        return query.plan_query(
+            self.capabilities,
+            earliest_time or self.default_earliest_time,
+            latest_time or self.default_latest_time,
+            min_players,
+            max_price,
+        )
+
+    def matching_courses(self, courses: list[Course]) -> list[Course]:
+        return [course for course in courses if course.key in self.course_keys]
+
+    def batch_key(self, course: Course) -> Hashable:
+        """Courses with equal keys may be fetched in the same request."""
+        return None
+
+    def batches(self, courses: list[Course]) -> list[list[Course]]:
+        groups: dict[Hashable, list[Course]] = {}
+        for course in courses:
+            groups.setdefault(self.batch_key(course), []).append(course)
+
+        size = self.max_batch_size
+        return [
+            group[i : i + size] if size else group
+            for group in groups.values()
+            for i in range(0, len(group), size or len(group))
+        ]
+
+    async def gather_batches(
+        self,
+        batches: list[list[Course]],
+        get_batch: Callable[[list[Course]], Awaitable[TeeTimeBatch]],
+    ) -> TeeTimeBatch:
+        """Fetch each batch of courses concurrently and merge the results.
+
+        A failed request marks its courses as failed instead of failing the
+        others, unless every request failed.
+        """
+        results = await asyncio.gather(
+            *[get_batch(batch) for batch in batches], return_exceptions=True
+        )
+        merged = TeeTimeBatch()
+        failed = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, TeeTimeBatch):
+                merged.extend(result)
+            elif isinstance(result, Exception):
+                failed.append((batch, result))
+            else:
+                raise result
+
+        if failed and len(failed) == len(batches):
+            raise failed[0][1]
+        for batch, error in failed:
+            merged.failed_courses.update(course.key for course in batch)
+            logger.warning(
+                f"Exception encountered while running {self.__class__.__name__} for {[course.name for course in batch]}: {error.__class__.__name__}"
+            )
+        return merged
 
     @abstractmethod
     async def get_tee_times(
@@ -171,5 +476,5 @@ class TeeTimeClient(ABC):
         latest_time: Time | None = None,
         min_players: int = 4,
         max_price: int | None = None,
-    ) -> list[TeeTime]:
+    ) -> TeeTimeBatch:
         ...
@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from pathlib import Path
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from httpx import Request, Response
+
+
+CACHE_TTL = float(os.environ.get("GOOKER_CACHE_TTL", 120))  # seconds
+CACHE_MAX_ENTRIES = int(os.environ.get("GOOKER_CACHE_MAX_ENTRIES", 2048))
+CACHE_DB_PATH = os.environ.get("GOOKER_CACHE_DB")
+PURGE_INTERVAL = 100  # sqlite writes between purges of expired entries
+
+logger = logging.getLogger(__name__)
+
+CachedResponse = tuple[float, int, str, bytes]  # expires at, status, content type, body
+
+
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    def __str__(self):
+        return f"hits={self.hits} misses={self.misses} evictions={self.evictions} expirations={self.expirations}"
+
+
+class ResponseCache:
+    """TTL cache of successful provider responses.
+
+    Entries live in a bounded in-memory LRU and, if `db_path` is given, in a
+    sqlite table so separate processes and restarts can reuse fresh results.
+    """
+
+    ttl: float
+    max_entries: int
+    stats: CacheStats
+    _entries: OrderedDict[str, CachedResponse]
+    _db_path: Path | None
+    _con: sqlite3.Connection | None
+    _writes: int
+
+    def __init__(
+        self,
+        ttl: float = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        db_path: str | Path | None = CACHE_DB_PATH,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._db_path = Path(db_path) if db_path else None
+        self._con = None
+        self._writes = 0
+
+    @staticmethod
+    def make_key(method: str, url: str, **kwargs) -> str:
+        return json.dumps(
+            [
+                method.upper(),
+                url,
+                kwargs.get("params"),
+                kwargs.get("json"),
+                kwargs.get("headers"),
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
+    @property
+    def con(self) -> sqlite3.Connection | None:
+        if self._db_path is None:
+            return None
+        if self._con is None:
+            self._con = sqlite3.connect(self._db_path)
+            with self._con as transaction:
+                transaction.execute(
+                    """
+                    create table if not exists response_cache (
+                        key text primary key,
+                        expires_at real,
+                        status_code integer,
+                        content_type text,
+                        content blob
+                    )
+                    """
+                )
+        return self._con
+
+    def _remember(self, key: str, entry: CachedResponse):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _lookup(self, key: str, now: float) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry
+            del self._entries[key]
+            self.stats.expirations += 1
+
+        if self.con is not None:
+            row = self.con.execute(
+                """
+                select expires_at, status_code, content_type, content
+                from response_cache
+                where key = ? and expires_at > ?
+                """,
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row)
+                return row
+
+        return None
+
+    def get(self, method: str, url: str, key: str) -> Response | None:
+        entry = self._lookup(key, time.time())
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        _, status_code, content_type, content = entry
+        return Response(
+            status_code,
+            headers={"Content-Type": content_type},
+            content=content,
+            request=Request(method, url),
+        )
+
+    def set(self, key: str, res: Response):
+        if self.ttl <= 0:
+            return
+
+        now = time.time()
+        entry = (
+            now + self.ttl,
+            res.status_code,
+            res.headers.get("Content-Type", "application/json"),
+            res.content,
+        )
+        self._remember(key, entry)
+
+        if self.con is not None:
+            with self.con as transaction:
+                transaction.execute(
+                    """
+                    insert or replace into response_cache
+                    (key, expires_at, status_code, content_type, content)
+                    values (?, ?, ?, ?, ?)
+                    """,
+                    (key, *entry),
+                )
+                self._writes += 1
+                if self._writes % PURGE_INTERVAL == 0:
+                    transaction.execute(
+                        "delete from response_cache where expires_at <= ?", (now,)
+                    )
+
+
+response_cache = ResponseCache()
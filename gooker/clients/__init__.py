@@ -1,39 +1,17 @@
 from gooker import base
+from gooker.registry import CourseRegistry
 from gooker.clients.ezlinks import LACityClient, LosRoblesClient, TeirraRejadaClient
-from gooker.clients.foreup import (
-    WestchesterClient,
-    RusticCanyonClient,
-    BethpageBlackClient,
-    BethpageRedClient,
-    BethpageBlueClient,
-    BethpageGreenClient,
-    BethpageYellowClient,
-)
-from gooker.clients.letsgogolf import (
-    LosVerdesClient,
-    MountainMeadowsClient,
-    ElDoradoClient,
-    BrooksideKoinerClient,
-    BrooksideNayClient,
-)
-from gooker.clients.teeitup import IndustryHillsIkeClient, IndustryHillsBabeClient
+from gooker.clients.foreup import ForeUpClient
+from gooker.clients.letsgogolf import LetsGoGolfClient
+from gooker.clients.teeitup import TeeItUpClient
 
 clients: list[type[base.TeeTimeClient]] = [
     LACityClient,
     LosRoblesClient,
-    WestchesterClient,
-    RusticCanyonClient,
+    ForeUpClient,
     TeirraRejadaClient,
-    LosVerdesClient,
-    MountainMeadowsClient,
-    ElDoradoClient,
-    BrooksideKoinerClient,
-    BrooksideNayClient,
-    IndustryHillsIkeClient,
-    IndustryHillsBabeClient,
-    BethpageBlackClient,
-    BethpageRedClient,
-    BethpageBlueClient,
-    BethpageGreenClient,
-    BethpageYellowClient,
+    LetsGoGolfClient,
+    TeeItUpClient,
 ]
+
+registry = CourseRegistry(clients)
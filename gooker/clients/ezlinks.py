@@ -1,13 +1,24 @@
-import pendulum
+import logging
+
 from pendulum.date import Date
 from pendulum.time import Time
 
 from gooker import base
+from gooker import query
+from gooker import timestamps
+
+
+SPLIT_STATUS_CODES = (400, 413, 414, 422)
+
+logger = logging.getLogger(__name__)
 
 
 class EZLinksBaseClient(base.TeeTimeClient):
     base_url: str
     courses: list[base.Course]
+    capabilities = query.ProviderCapabilities(
+        time_granularity=1, inclusive_time_window=True
+    )
 
     async def get_tee_times(
         self,
@@ -17,52 +28,70 @@ class EZLinksBaseClient(base.TeeTimeClient):
         latest_time: Time | None = None,
         min_players: int = 4,
         max_price: int | None = None,
-    ) -> list[base.TeeTime]:
-        matching_courses = [course for course in courses if course in self.courses]
+    ) -> base.TeeTimeBatch:
+        matching_courses = self.matching_courses(courses)
 
         if not matching_courses:
-            return []
+            return base.TeeTimeBatch()
 
-        res = await self.client.post(
+        provider_query, residual = self.plan_query(
+            earliest_time, latest_time, min_players, max_price
+        )
+        return await self.gather_batches(
+            self.batches(matching_courses),
+            lambda batch: self._get_batch_tee_times(
+                batch, date, provider_query, residual
+            ),
+        )
+
+    async def _get_batch_tee_times(
+        self,
+        courses: list[base.Course],
+        date: Date,
+        provider_query: query.ProviderQuery,
+        residual: query.TeeTimeFilter,
+    ) -> base.TeeTimeBatch:
+        res = await self.request(
+            "POST",
             "/search/search",
             json={
-                "p01": [c.id for c in matching_courses],
+                "p01": [c.id for c in courses],
                 "p02": date.format("MM/DD/YYYY"),
-                "p03": (earliest_time or self.default_earliest_time).format("h:mm A"),
-                "p04": (latest_time or self.default_latest_time).format("h:mm A"),
+                "p03": provider_query.earliest_time.format("h:mm A"),  # type: ignore
+                "p04": provider_query.latest_time.format("h:mm A"),  # type: ignore
                 "p05": 0,
                 "p06": -1,
                 "p07": False,
             },
         )
+
+        # if the API rejects the number of course ids, split the batch and retry
+        if res.status_code in SPLIT_STATUS_CODES and len(courses) > 1:
+            logger.info(
+                f"{self.__class__.__name__} rejected {len(courses)} courses with {res.status_code}, splitting request"
+            )
+            mid = len(courses) // 2
+            return await self.gather_batches(
+                [courses[:mid], courses[mid:]],
+                lambda batch: self._get_batch_tee_times(
+                    batch, date, provider_query, residual
+                ),
+            )
+
         res.raise_for_status()
 
-        tee_times = []
+        tee_times = base.TeeTimeBatch()
         for r in res.json()["r06"]:
-            num_players = r["r11"]
-            price = float(r["r25"])
-            if num_players < min_players or (
-                max_price is not None and price > max_price
-            ):
-                continue
-
-            tee_time = base.TeeTime(
-                course=next(c for c in matching_courses if c.id == r["r07"]),
-                tee_time=pendulum.parser.parse(r["r15"], tz="America/Los_Angeles"),  # type: ignore
-                num_golfers=num_players,
-                price=price,
+            tee_times.append(
+                course=self.courses_by_id[r["r07"]],
+                tee_time=timestamps.parse_local(r["r15"]),
+                num_golfers=r["r11"],
+                price=float(r["r25"]),
             )
 
-            # search for existing tee time, meaning this is a different price
-            # for same tee time. Keep the one with higher price
-            try:
-                existing_tee_time_idx = tee_times.index(tee_time)
-                if tee_time.price > tee_times[existing_tee_time_idx].price:
-                    tee_times[existing_tee_time_idx] = tee_time
-            except ValueError:
-                tee_times.append(tee_time)
-
-        return tee_times
+        # the same tee time can be listed once per rate, every rate is kept so
+        # each search can pick from the ones within its own filters
+        return tee_times.filter(residual)
 
 
 class LosRoblesClient(EZLinksBaseClient):
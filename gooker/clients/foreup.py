@@ -1,13 +1,16 @@
-import pendulum
 from pendulum.date import Date
 from pendulum.time import Time
 
 from gooker import base
+from gooker import query
+from gooker import timestamps
 
 
 class ForeUpBaseClient(base.TeeTimeClient):
     courses: list[base.Course]
     base_url = "https://foreupsoftware.com/index.php/api"
+    max_batch_size = 1  # the API only accepts one schedule_id per request
+    capabilities = query.ProviderCapabilities(min_players=True)
 
     async def get_tee_times(
         self,
@@ -17,54 +20,53 @@ class ForeUpBaseClient(base.TeeTimeClient):
         latest_time: Time | None = None,
         min_players: int = 4,
         max_price: int | None = None,
-    ) -> list[base.TeeTime]:
-        if len(self.courses) > 1:
-            raise ValueError(
-                "A foreup client may only have one course due to restrictions from their API."
-            )
-
-        course = self.courses[0]
+    ) -> base.TeeTimeBatch:
+        matching_courses = self.matching_courses(courses)
 
-        if course not in courses:
-            return []
+        provider_query, residual = self.plan_query(
+            earliest_time, latest_time, min_players, max_price
+        )
+        return await self.gather_batches(
+            self.batches(matching_courses),
+            lambda batch: self._get_course_tee_times(
+                batch[0], date, provider_query, residual
+            ),
+        )
 
-        res = await self.client.get(
+    async def _get_course_tee_times(
+        self,
+        course: base.Course,
+        date: Date,
+        provider_query: query.ProviderQuery,
+        residual: query.TeeTimeFilter,
+    ) -> base.TeeTimeBatch:
+        res = await self.request(
+            "GET",
             "/booking/times",
             params={
                 "time": "all",
                 "date": date.format("MM-DD-YYYY"),
                 "holes": "all",
-                "players": 0,
+                "players": provider_query.min_players or 0,
                 "api_key": "no_limits",
                 "schedule_id": course.id,
             },
         )
         res.raise_for_status()
 
-        tee_times = []
+        tee_times = base.TeeTimeBatch()
         for r in res.json():
-            tee_time = pendulum.from_format(r["time"], "YYYY-MM-DD HH:mm", tz="America/Los_Angeles")  # type: ignore
-            num_players = r["available_spots"]
-            price = r["green_fee"]
-            if (
-                tee_time.time() > (earliest_time or self.default_earliest_time)
-                and tee_time.time() < (latest_time or self.default_latest_time)
-                and num_players >= min_players
-                and (max_price is None or r["green_fee"] <= max_price)
-            ):
-                tee_times.append(
-                    base.TeeTime(
-                        course=course,
-                        tee_time=tee_time,
-                        num_golfers=num_players,
-                        price=price,
-                    )
-                )
+            tee_times.append(
+                course=course,
+                tee_time=timestamps.parse_local(r["time"]),
+                num_golfers=r["available_spots"],
+                price=r["green_fee"],
+            )
 
-        return tee_times
+        return tee_times.filter(residual)
 
 
-class WestchesterClient(ForeUpBaseClient):
+class ForeUpClient(ForeUpBaseClient):
     courses = [
         base.Course(
             name="Westchester",
@@ -74,11 +76,6 @@ class WestchesterClient(ForeUpBaseClient):
             is_par_70_plus=False,
             booking_info="https://foreupsoftware.com/index.php/booking/20137/3786#/teetimes",
         ),
-    ]
-
-
-class RusticCanyonClient(ForeUpBaseClient):
-    courses = [
         base.Course(
             name="Rustic Canyon",
             id=9285,
@@ -87,11 +84,6 @@ class RusticCanyonClient(ForeUpBaseClient):
             is_par_70_plus=True,
             booking_info="https://foreupsoftware.com/index.php/booking/21903/9285#teetimes",
         ),
-    ]
-
-
-class BethpageBlackClient(ForeUpBaseClient):
-    courses = [
         base.Course(
             name="Bethpage - Black",
             id=2431,
@@ -99,12 +91,7 @@ class BethpageBlackClient(ForeUpBaseClient):
             is_9_hole=False,
             is_par_70_plus=True,
             booking_info="https://foreupsoftware.com/index.php/booking/19765/2431#teetimes",
-        )
-    ]
-
-
-class BethpageRedClient(ForeUpBaseClient):
-    courses = [
+        ),
         base.Course(
             name="Bethpage - Red",
             id=2432,
@@ -112,12 +99,7 @@ class BethpageRedClient(ForeUpBaseClient):
             is_9_hole=False,
             is_par_70_plus=True,
             booking_info="https://foreupsoftware.com/index.php/booking/19765/2432#teetimes",
-        )
-    ]
-
-
-class BethpageBlueClient(ForeUpBaseClient):
-    courses = [
+        ),
         base.Course(
             name="Bethpage - Blue",
             id=2433,
@@ -125,12 +107,7 @@ class BethpageBlueClient(ForeUpBaseClient):
             is_9_hole=False,
             is_par_70_plus=True,
             booking_info="https://foreupsoftware.com/index.php/booking/19765/2433#teetimes",
-        )
-    ]
-
-
-class BethpageGreenClient(ForeUpBaseClient):
-    courses = [
+        ),
         base.Course(
             name="Bethpage - Green",
             id=2434,
@@ -138,12 +115,7 @@ class BethpageGreenClient(ForeUpBaseClient):
             is_9_hole=False,
             is_par_70_plus=True,
             booking_info="https://foreupsoftware.com/index.php/booking/19765/2434#teetimes",
-        )
-    ]
-
-
-class BethpageYellowClient(ForeUpBaseClient):
-    courses = [
+        ),
         base.Course(
             name="Bethpage - Yellow",
             id=2435,
@@ -151,5 +123,5 @@ class BethpageYellowClient(ForeUpBaseClient):
             is_9_hole=False,
             is_par_70_plus=True,
             booking_info="https://foreupsoftware.com/index.php/booking/19765/0#teetimes",
-        )
+        ),
     ]
@@ -1,9 +1,9 @@
-import pendulum
 from pendulum.date import Date
 from pendulum.time import Time
-from pendulum.datetime import DateTime
 
 from gooker import base
+from gooker import query
+from gooker import timestamps
 
 
 class LetsGoGolfCourse(base.Course):
@@ -13,6 +13,8 @@ class LetsGoGolfCourse(base.Course):
 class LetsGoGolfBaseClient(base.TeeTimeClient):
     courses: list[LetsGoGolfCourse]
     base_url = "https://sg-membership20-portalapi-production.azurewebsites.net/api"
+    max_batch_size = 1  # the API only accepts one slug per request
+    capabilities = query.ProviderCapabilities(time_granularity=60, max_price=True)
 
     async def get_tee_times(
         self,
@@ -22,26 +24,38 @@ class LetsGoGolfBaseClient(base.TeeTimeClient):
         latest_time: Time | None = None,
         min_players: int = 4,
         max_price: int | None = None,
-    ) -> list[base.TeeTime]:
-        if len(self.courses) > 1:
-            raise ValueError(
-                "A letsgogolf client may only have one course due to restrictions from their API."
-            )
-
-        course = self.courses[0]
+    ) -> base.TeeTimeBatch:
+        matching_courses = self.matching_courses(courses)
 
-        if course not in courses:
-            return []
+        provider_query, residual = self.plan_query(
+            earliest_time, latest_time, min_players, max_price
+        )
+        return await self.gather_batches(
+            self.batches(matching_courses),
+            lambda batch: self._get_course_tee_times(
+                batch[0], date, provider_query, residual
+            ),
+        )
 
-        res = await self.client.get(
+    async def _get_course_tee_times(
+        self,
+        course: LetsGoGolfCourse,
+        date: Date,
+        provider_query: query.ProviderQuery,
+        residual: query.TeeTimeFilter,
+    ) -> base.TeeTimeBatch:
+        res = await self.request(
+            "GET",
             "/courses/reservations_group",
             params={
                 "allCartSelected": True,
                 "allRatesSelected": True,
                 "date": date.isoformat(),
-                "min_hour": (earliest_time or self.default_earliest_time).hour,
-                "max_hour": (latest_time or self.default_latest_time).hour + 1,
-                "max_price": 500,
+                "min_hour": provider_query.earliest_time.hour,  # type: ignore
+                "max_hour": provider_query.latest_time.hour + 1,  # type: ignore
+                "max_price": provider_query.max_price
+                if provider_query.max_price is not None
+                else 500,
                 "min_price": 0,
                 "slug": course.id,
                 "programId": course.program_id,
@@ -49,31 +63,19 @@ class LetsGoGolfBaseClient(base.TeeTimeClient):
         )
         res.raise_for_status()
 
-        tee_times = []
+        tee_times = base.TeeTimeBatch()
         for r in res.json()["tee_time_groups"]:
-            tee_time: DateTime
-            tee_time = pendulum.parser.parse(r["tee_off_at_local"][:-1], tz="America/Los_Angeles")  # type: ignore
-            num_players = max(r["players"])
-            price = r["max_regular_rate"]
-            if (
-                tee_time.time() > (earliest_time or self.default_earliest_time)
-                and tee_time.time() < (latest_time or self.default_latest_time)
-                and num_players >= min_players
-                and (max_price is None or price <= max_price)
-            ):
-                tee_times.append(
-                    base.TeeTime(
-                        course=course,
-                        tee_time=tee_time,
-                        num_golfers=num_players,
-                        price=price,
-                    )
-                )
+            tee_times.append(
+                course=course,
+                tee_time=timestamps.parse_local(r["tee_off_at_local"][:-1]),
+                num_golfers=max(r["players"]),
+                price=r["max_regular_rate"],
+            )
 
-        return tee_times
+        return tee_times.filter(residual)
 
 
-class LosVerdesClient(LetsGoGolfBaseClient):
+class LetsGoGolfClient(LetsGoGolfBaseClient):
     courses = [
         LetsGoGolfCourse(
             name="Los Verdes",
@@ -83,12 +85,7 @@ class LosVerdesClient(LetsGoGolfBaseClient):
             is_par_70_plus=True,
             program_id=49,
             booking_info="https://letsgo.golf/los-verdes-golf-course/teeTimes/los-verdes-golf-course-california?date=2023-04-19",
-        )
-    ]
-
-
-class MountainMeadowsClient(LetsGoGolfBaseClient):
-    courses = [
+        ),
         LetsGoGolfCourse(
             name="Mountain Meadows",
             id="mountain-meadows-golf-course-california",
@@ -97,12 +94,7 @@ class MountainMeadowsClient(LetsGoGolfBaseClient):
             is_par_70_plus=True,
             program_id=48,
             booking_info="https://letsgo.golf/mountain-meadows-golf-course/teeTimes/mountain-meadows-golf-course-california",
-        )
-    ]
-
-
-class ElDoradoClient(LetsGoGolfBaseClient):
-    courses = [
+        ),
         LetsGoGolfCourse(
             name="El Dorado",
             id="el-dorado-park-golf-course-california",
@@ -111,12 +103,7 @@ class ElDoradoClient(LetsGoGolfBaseClient):
             is_par_70_plus=True,
             program_id=56,
             booking_info="https://letsgo.golf/el-dorado-park-golf-course/teeTimes/el-dorado-park-golf-course-california",
-        )
-    ]
-
-
-class BrooksideKoinerClient(LetsGoGolfBaseClient):
-    courses = [
+        ),
         LetsGoGolfCourse(
             name="Brookside - Koiner",
             id="brookside-golf-club-c-w-koiner-1-california",
@@ -126,11 +113,6 @@ class BrooksideKoinerClient(LetsGoGolfBaseClient):
             program_id=42,
             booking_info="https://letsgo.golf/brookside-golf-club/teeTimes/brookside-golf-club-c-w-koiner-1-california",
         ),
-    ]
-
-
-class BrooksideNayClient(LetsGoGolfBaseClient):
-    courses = [
         LetsGoGolfCourse(
             name="Brookside - Nay",
             id="brookside-golf-club-e-o-nay-california",
@@ -1,9 +1,9 @@
-import pendulum
 from pendulum.date import Date
 from pendulum.time import Time
-from pendulum.datetime import DateTime
 
 from gooker import base
+from gooker import query
+from gooker import timestamps
 
 
 class TeeItUpCourse(base.Course):
@@ -14,6 +14,10 @@ class TeeItUpBaseClient(base.TeeTimeClient):
     courses: list[TeeItUpCourse]
     base_url = "https://phx-api-be-east-1b.kenna.io/v2"
 
+    # facilities can only be requested together under the same alias, and
+    # every course has its own
+    max_batch_size = 1
+
     async def get_tee_times(
         self,
         courses: list[TeeItUpCourse],
@@ -22,52 +26,48 @@ class TeeItUpBaseClient(base.TeeTimeClient):
         latest_time: Time | None = None,
         min_players: int = 4,
         max_price: int | None = None,
-    ) -> list[base.TeeTime]:
-        if len(self.courses) > 1:
-            raise ValueError(
-                "A teeitup client may only have one course due to restrictions from their API."
-            )
-
-        course = self.courses[0]
+    ) -> base.TeeTimeBatch:
+        matching_courses = self.matching_courses(courses)
 
-        if course not in courses:
-            return []
+        _, residual = self.plan_query(
+            earliest_time, latest_time, min_players, max_price
+        )
+        return await self.gather_batches(
+            self.batches(matching_courses),
+            lambda batch: self._get_course_tee_times(batch[0], date, residual),
+        )
 
-        res = await self.client.get(
+    async def _get_course_tee_times(
+        self,
+        course: TeeItUpCourse,
+        date: Date,
+        residual: query.TeeTimeFilter,
+    ) -> base.TeeTimeBatch:
+        res = await self.request(
+            "GET",
             "/tee-times",
             params={"date": date.isoformat(), "facilityIds": course.id},
             headers={"x-be-alias": course.slug},
         )
         res.raise_for_status()
 
-        tee_times = []
-        for r in res.json()[0]["teetimes"]:
-            tee_time: DateTime
-            tee_time = pendulum.parser.parse(r["teetime"]).in_timezone("America/Los_Angeles")  # type: ignore
-            rate = r["rates"][0]
-            num_players = max(rate["allowedPlayers"])
-            price = int(rate["greenFeeCart"]) / 100
-            holes = rate["holes"]
-            if (
-                holes == 18
-                and tee_time.time() > (earliest_time or self.default_earliest_time)
-                and tee_time.time() < (latest_time or self.default_latest_time)
-                and num_players >= min_players
-                and (max_price is None or price <= max_price)
-            ):
+        tee_times = base.TeeTimeBatch()
+        for facility in res.json():
+            for r in facility["teetimes"]:
+                rate = r["rates"][0]
+                if rate["holes"] != 18:
+                    continue
                 tee_times.append(
-                    base.TeeTime(
-                        course=course,
-                        tee_time=tee_time,
-                        num_golfers=num_players,
-                        price=price,
-                    )
+                    course=course,
+                    tee_time=timestamps.parse_utc(r["teetime"]),
+                    num_golfers=max(rate["allowedPlayers"]),
+                    price=int(rate["greenFeeCart"]) / 100,
                 )
 
-        return tee_times
+        return tee_times.filter(residual)
 
 
-class IndustryHillsIkeClient(TeeItUpBaseClient):
+class TeeItUpClient(TeeItUpBaseClient):
     courses = [
         TeeItUpCourse(
             name="Industry Hills - Ike",
@@ -77,12 +77,7 @@ class IndustryHillsIkeClient(TeeItUpBaseClient):
             is_par_70_plus=True,
             booking_info="(626) 810-4653",
             slug="industry-hills-golf-club-ike-course",
-        )
-    ]
-
-
-class IndustryHillsBabeClient(TeeItUpBaseClient):
-    courses = [
+        ),
         TeeItUpCourse(
             name="Industry Hills - Babe",
             id=4735,
@@ -91,5 +86,5 @@ class IndustryHillsBabeClient(TeeItUpBaseClient):
             is_par_70_plus=True,
             booking_info="(626) 810-4653",
             slug="industry-hills-golf-club-babe-course",
-        )
+        ),
     ]
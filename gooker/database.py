@@ -2,8 +2,9 @@ import sqlite3
 from contextlib import AbstractContextManager
 from typing import Union
 from types import TracebackType
-from functools import partial
+from functools import cache, partial
 from pathlib import Path
+import threading
 import logging
 import json
 import uuid
@@ -14,10 +15,17 @@ from pendulum.time import Time
 from pendulum.datetime import DateTime
 
 from gooker import base
+from gooker import notify
+from gooker import timestamps
+from gooker.clients import registry
+from gooker.diff import TeeTimeDiff
 
 
+DB_PATH = Path(__file__).parent.parent / ".gooker.db"
 DB_INIT_PATH = Path(__file__).parent.parent / "db" / "init.sql"
 MIGRATION_PATH = Path(__file__).parent.parent / "db" / "migrations"
+CACHED_STATEMENTS = 256
+BUSY_TIMEOUT = 5000  # ms to wait on another process' write lock
 
 logger = logging.getLogger("database")
 
@@ -43,42 +51,75 @@ sqlite3.register_converter("datetime", partial(convert_date_time, DateTime))
 
 sqlite3.register_adapter(base.TeeTimeSearchParams, lambda x: x.json())
 sqlite3.register_converter("tee_time_search_params", base.TeeTimeSearchParams.parse_raw)
-sqlite3.register_adapter(base.TeeTime, lambda x: x.json())
-sqlite3.register_converter("tee_time", base.TeeTime.parse_raw)
 sqlite3.register_adapter(list, json.dumps)
 sqlite3.register_converter("text_list", json.loads)
 sqlite3.register_adapter(uuid.UUID, str)
 sqlite3.register_converter("uuid", lambda x: uuid.UUID(x.decode()))
 
 
-class DBClient(AbstractContextManager):
-    con: sqlite3.Connection
+@cache
+def _migrations() -> list[Path]:
+    return sorted(path for path in MIGRATION_PATH.glob("*.sql") if path.is_file())
 
-    def __enter__(self):
-        self.con = sqlite3.connect(
-            Path(__file__).parent.parent / ".gooker.db",
+
+def _migrate(con: sqlite3.Connection):
+    with con as transaction:
+        transaction.executescript(DB_INIT_PATH.read_text())
+        cursor = transaction.execute("select max(name) from __migrations__;")
+        cur_migration = cursor.fetchone()[0]
+
+    for path in _migrations():
+        with con as transaction:
+            if cur_migration and path.stem <= cur_migration:
+                continue
+
+            logger.info(f"Applying {path.stem}...")
+            transaction.executescript(path.read_text())
+            transaction.execute(
+                "insert into __migrations__ (name, applied_at) values (?, ?)",
+                (path.stem, pendulum.now().date()),
+            )
+
+    # user_version is what lets later connections skip all of the above
+    con.execute(f"pragma user_version = {len(_migrations())}")
+
+
+_connections: dict[tuple[Path, int], sqlite3.Connection] = {}
+
+
+def connect(path: Path = DB_PATH) -> sqlite3.Connection:
+    """Shared connection for the current thread, migrated on first use."""
+    key = (path, threading.get_ident())
+    con = _connections.get(key)
+    if con is None:
+        con = sqlite3.connect(
+            path,
             detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=CACHED_STATEMENTS,
         )
-        with self.con as transaction:
-            transaction.executescript(DB_INIT_PATH.read_text())
-            cursor = transaction.execute("select max(name) from __migrations__;")
-            cur_migration = cursor.fetchone()[0]
+        # WAL lets the CLI read while the poller writes
+        con.execute("pragma journal_mode = wal")
+        con.execute("pragma synchronous = normal")
+        con.execute(f"pragma busy_timeout = {BUSY_TIMEOUT}")
+        if con.execute("pragma user_version").fetchone()[0] < len(_migrations()):
+            _migrate(con)
+        con.execute("pragma foreign_keys = on")
+        _connections[key] = con
+    return con
 
-        for path in sorted(MIGRATION_PATH.glob("*.sql")):
-            with self.con as transaction:
-                if not path.is_file():
-                    continue
 
-                if cur_migration and str(path) <= cur_migration:
-                    continue
+def close():
+    for con in _connections.values():
+        con.close()
+    _connections.clear()
 
-                logger.info(f"Applying {path.stem}...")
-                transaction.executescript(path.read_text())
-                transaction.execute(
-                    "insert into __migrations__ (name, applied_at) values (?, ?)",
-                    (path.stem, pendulum.now().date()),
-                )
 
+class DBClient(AbstractContextManager):
+    con: sqlite3.Connection
+    _course_group_writes: int = 0
+
+    def __enter__(self):
+        self.con = connect()
         return self
 
     def __exit__(
@@ -87,13 +128,20 @@ class DBClient(AbstractContextManager):
         __exc_value: BaseException | None,
         __traceback: TracebackType | None,
     ) -> bool | None:
-        self.con.close()
+        # the connection stays open for the next client, see `close`
         return super().__exit__(__exc_type, __exc_value, __traceback)
 
-    def get_current_tee_time_searches(self) -> list[base.TeeTimeSearch]:
-        res = self.con.execute(
-            "select id, notification_method, notification_destination, search_params from tee_time_search"
-        )
+    def get_current_tee_time_searches(
+        self, ids: set[uuid.UUID] | None = None
+    ) -> list[base.TeeTimeSearch]:
+        """Load every search, or only those in `ids`."""
+        query = "select id, notification_method, notification_destination, search_params from tee_time_search"
+        params: tuple = ()
+        if ids is not None:
+            # filtered here so only the wanted searches' params are parsed
+            query += " where id in (select value from json_each(?))"
+            params = (json.dumps([str(id) for id in ids]),)
+        res = self.con.execute(query, params)
         return [
             base.TeeTimeSearch(
                 id=row[0],
@@ -135,37 +183,252 @@ class DBClient(AbstractContextManager):
                 (search.id,),
             )
 
-    def get_current_tee_time_search_results(self, id: uuid.UUID) -> list[base.TeeTime]:
+    def delete_expired_tee_time_searches(self, today: Date) -> list[uuid.UUID]:
+        """Delete every search whose end date is before `today`, with its results."""
+        with self.con as transaction:
+            res = transaction.execute(
+                """
+                delete from tee_time_search
+                where json_extract(search_params, '$.end_date') < ?
+                returning id
+                """,
+                (today.isoformat(),),
+            )
+            return [row[0] for row in res.fetchall()]
+
+    def _result_slots(self, rows: list[tuple]) -> list[base.Slot]:
+        tee_times = []
+        for course_name, tee_time, num_golfers, price in rows:
+            course = registry.get(course_name)
+            if course is None:
+                logger.warning(f"Skipping result for unknown course {course_name}")
+                continue
+            tee_times.append(
+                base.Slot(course, timestamps.from_epoch(tee_time), num_golfers, price)
+            )
+        return tee_times
+
+    def get_tee_time_searches_with_results(
+        self, ids: set[uuid.UUID] | None = None
+    ) -> list[tuple[base.TeeTimeSearch, list[base.Slot]]]:
+        """Load searches, or only those in `ids`, along with their stored results.
+
+        Takes one query for the searches and one for all of their results.
+        """
+        searches = self.get_current_tee_time_searches(ids)
+        if not searches:
+            return []
+
         res = self.con.execute(
-            "select tee_time from tee_time_search_result where search_id = ?", (id,)
+            """
+            select search_id, course_name, tee_time, num_golfers, price
+            from tee_time_search_result
+            where search_id in (select value from json_each(?))
+            """,
+            (json.dumps([str(search.id) for search in searches]),),
+        )
+        rows: dict[uuid.UUID, list[tuple]] = {}
+        for search_id, *row in res.fetchall():
+            rows.setdefault(search_id, []).append(row)
+
+        return [
+            (search, self._result_slots(rows.get(search.id, []))) for search in searches
+        ]
+
+    def _upsert_tee_time_search_results(
+        self,
+        transaction: sqlite3.Connection,
+        id: uuid.UUID,
+        tee_times: list[base.AnyTeeTime],
+    ):
+        transaction.executemany(
+            """
+            insert into tee_time_search_result
+            (search_id, course_name, course_id, tee_time, num_golfers, price)
+            values (?, ?, ?, ?, ?, ?)
+            on conflict (search_id, course_name, tee_time) do update set
+                course_id = excluded.course_id,
+                num_golfers = excluded.num_golfers,
+                price = excluded.price
+            """,
+            (
+                (
+                    id,
+                    tee_time.course.name,
+                    str(tee_time.course.id),
+                    tee_time.tee_time.int_timestamp,
+                    tee_time.num_golfers,
+                    tee_time.price,
+                )
+                for tee_time in tee_times
+            ),
+        )
+
+    def _delete_tee_time_search_results(
+        self,
+        transaction: sqlite3.Connection,
+        id: uuid.UUID,
+        tee_times: list[base.AnyTeeTime],
+    ):
+        transaction.executemany(
+            """
+            delete from tee_time_search_result
+            where search_id = ? and course_name = ? and tee_time = ?
+            """,
+            (
+                (id, tee_time.course.name, tee_time.tee_time.int_timestamp)
+                for tee_time in tee_times
+            ),
         )
-        return [row[0] for row in res.fetchall()]
 
     def insert_tee_time_search_results(
-        self, id: uuid.UUID, tee_times: list[base.TeeTime]
+        self, id: uuid.UUID, tee_times: list[base.AnyTeeTime]
     ):
+        with self.con as transaction:
+            self._upsert_tee_time_search_results(transaction, id, tee_times)
+
+    def delete_tee_time_search_results(
+        self, id: uuid.UUID, tee_times: list[base.AnyTeeTime]
+    ):
+        with self.con as transaction:
+            self._delete_tee_time_search_results(transaction, id, tee_times)
+
+    def apply_tee_time_search_diff(
+        self,
+        id: uuid.UUID,
+        diff: TeeTimeDiff,
+        notification: notify.Notification | None = None,
+    ):
+        """Store a search's new results, queueing its notification atomically."""
+        with self.con as transaction:
+            self._delete_tee_time_search_results(transaction, id, diff.removed)
+            self._upsert_tee_time_search_results(
+                transaction, id, diff.added + [new for _, new in diff.changed]
+            )
+            if notification is not None:
+                transaction.execute(
+                    """
+                    insert into notification_outbox
+                    (
+                        search_id,
+                        method,
+                        destination,
+                        subject,
+                        tee_times,
+                        search_message,
+                        next_attempt_at
+                    )
+                    values (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        notification.search_id,
+                        notification.method,
+                        notification.destination,
+                        notification.subject,
+                        json.dumps(
+                            [
+                                (
+                                    tee_time.course.name,
+                                    tee_time.tee_time.int_timestamp,
+                                    tee_time.num_golfers,
+                                    tee_time.price,
+                                )
+                                for tee_time in notification.tee_times
+                            ]
+                        ),
+                        notification.search_message,
+                        pendulum.now().timestamp() + notify.DIGEST_WINDOW,
+                    ),
+                )
+
+    def get_due_notifications(
+        self, now: float, limit: int = 100
+    ) -> list[notify.Notification]:
+        """Due notifications, plus any not yet due for the same recipients."""
+        res = self.con.execute(
+            """
+            select
+                id,
+                search_id,
+                method,
+                destination,
+                subject,
+                tee_times,
+                search_message,
+                body,
+                attempts
+            from notification_outbox
+            where next_attempt_at is not null and (method, destination) in (
+                select method, destination
+                from notification_outbox
+                where next_attempt_at <= ?
+            )
+            order by next_attempt_at
+            limit ?
+            """,
+            (now, limit),
+        )
+        return [
+            notify.Notification(
+                id=row[0],
+                search_id=row[1],
+                method=row[2],
+                destination=row[3],
+                subject=row[4],
+                tee_times=self._result_slots(json.loads(row[5])),
+                search_message=row[6],
+                body=row[7],
+                attempts=row[8],
+            )
+            for row in res.fetchall()
+        ]
+
+    def next_notification_at(self, now: float) -> float | None:
+        """When the next notification that isn't due yet becomes due."""
+        return self.con.execute(
+            "select min(next_attempt_at) from notification_outbox where next_attempt_at > ?",
+            (now,),
+        ).fetchone()[0]
+
+    def delete_notifications(self, notifications: list[notify.Notification]):
         with self.con as transaction:
             transaction.executemany(
-                """
-                insert into tee_time_search_result
-                (search_id,tee_time)
-                values (?, ?)
-                """,
-                ((id, tee_time) for tee_time in tee_times),
+                "delete from notification_outbox where id = ?",
+                ((notification.id,) for notification in notifications),
             )
 
-    def delete_tee_time_search_results(
-        self, id: uuid.UUID, tee_times: list[base.TeeTime]
+    def retry_notifications(
+        self,
+        notifications: list[notify.Notification],
+        next_attempt_at: float | None,
+        error: str,
     ):
+        """Record a failed delivery, giving up on them if `next_attempt_at` is None."""
         with self.con as transaction:
             transaction.executemany(
                 """
-                delete from tee_time_search_result
-                where search_id = ? and tee_time = ?
+                update notification_outbox
+                set attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+                where id = ?
                 """,
-                ((id, tee_time) for tee_time in tee_times),
+                (
+                    (next_attempt_at, error, notification.id)
+                    for notification in notifications
+                ),
             )
 
+    def course_groups_version(self) -> tuple[int, int, int]:
+        """Changes whenever course groups may have changed.
+
+        `data_version` only moves when other connections commit, so writes made
+        in this process are counted separately.
+        """
+        return (
+            id(self.con),
+            self.con.execute("pragma data_version").fetchone()[0],
+            self._course_group_writes,
+        )
+
     def get_course_group(self, course_group: str):
         res = self.con.execute(
             """select course_name 
@@ -183,6 +446,7 @@ class DBClient(AbstractContextManager):
         return [row[0] for row in courses]
 
     def insert_coures_group(self, course_group: str, courses: list[str]):
+        type(self)._course_group_writes += 1
         with self.con as transaction:
             transaction.execute(
                 """
@@ -202,6 +466,7 @@ class DBClient(AbstractContextManager):
             )
 
     def add_to_course_group(self, course_group: str, courses: list[str]):
+        type(self)._course_group_writes += 1
         with self.con as transaction:
             transaction.executemany(
                 """
@@ -213,6 +478,7 @@ class DBClient(AbstractContextManager):
             )
 
     def delete_from_course_group(self, course_group: str, courses: list[str]):
+        type(self)._course_group_writes += 1
         with self.con as transaction:
             transaction.executemany(
                 """
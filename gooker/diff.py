@@ -0,0 +1,53 @@
+from dataclasses import dataclass, field
+from typing import AbstractSet
+
+from pendulum.date import Date
+
+from gooker import base
+
+
+@dataclass
+class TeeTimeDiff:
+    added: list[base.AnyTeeTime] = field(default_factory=list)
+    removed: list[base.AnyTeeTime] = field(default_factory=list)
+    changed: list[tuple[base.AnyTeeTime, base.AnyTeeTime]] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_tee_times(
+    old: list[base.AnyTeeTime],
+    new: list[base.AnyTeeTime],
+    incomplete: AbstractSet[tuple[str, Date]] = frozenset(),
+) -> TeeTimeDiff:
+    """Compare two sets of tee times by course and start time.
+
+    Tee times present in both whose price or number of available spots
+    differ are reported as changed, as (old, new) pairs. Old tee times are
+    only reported as removed if their (course name, date) isn't in
+    `incomplete`, since missing from a failed fetch doesn't mean gone.
+    """
+    old_index = {tee_time.key: tee_time for tee_time in old}
+    new_index: dict = {}
+    for tee_time in new:
+        new_index.setdefault(tee_time.key, tee_time)
+
+    diff = TeeTimeDiff()
+    for key, tee_time in new_index.items():
+        old_tee_time = old_index.get(key)
+        if old_tee_time is None:
+            diff.added.append(tee_time)
+        elif (
+            old_tee_time.price != tee_time.price
+            or old_tee_time.num_golfers != tee_time.num_golfers
+        ):
+            diff.changed.append((old_tee_time, tee_time))
+
+    diff.removed = [
+        tee_time
+        for key, tee_time in old_index.items()
+        if key not in new_index
+        and (tee_time.course.name, tee_time.tee_time.date()) not in incomplete
+    ]
+    return diff
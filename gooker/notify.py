@@ -1,30 +1,178 @@
 import os
-from typing import Literal
+import asyncio
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import smtplib
 from email.message import EmailMessage
 
+from gooker import base
 
-def send_email(subject: str, body: str, recipients: list[str]):
-    account = os.environ["GMAIL_ACCOUNT"]
-    password = os.environ["GMAIL_PASSWORD"]
 
-    server = smtplib.SMTP("smtp.gmail.com", 587)
-    try:
-        server.starttls()
-        server.login(account, password)
+SMTP_HOST = os.environ.get("GOOKER_SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("GOOKER_SMTP_PORT", 587))
+SMTP_TIMEOUT = 30
+# only turn off for a local server, credentials are then sent unencrypted
+SMTP_STARTTLS = os.environ.get("GOOKER_SMTP_STARTTLS", "1") != "0"
+SMTP_FROM = os.environ.get("GOOKER_SMTP_FROM")  # defaults to GMAIL_ACCOUNT
+SMTP_SESSIONS = int(os.environ.get("GOOKER_SMTP_SESSIONS", 2))
+# seconds a notification waits for others to the same recipients to join it,
+# notifications from the same poll cycle are always merged
+DIGEST_WINDOW = float(os.environ.get("GOOKER_DIGEST_WINDOW", 0))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Notification:
+    search_id: uuid.UUID
+    method: str
+    destination: list[str]
+    subject: str
+    tee_times: list[base.Slot] = field(default_factory=list)
+    search_message: str = ""
+    # already rendered message, only for notifications queued before digests
+    body: str | None = None
+    id: int | None = None
+    attempts: int = 0
+
+    @property
+    def digest_key(self) -> tuple | None:
+        if self.body is not None:
+            return None
+        return (self.method, tuple(sorted(self.destination)))
+
+
+def render(notifications: list[Notification]) -> tuple[str, str]:
+    """Subject and body of one message covering `notifications`.
+
+    Tee times found by several of the searches are listed once, with the
+    details from the most recent notification.
+    """
+    if len(notifications) == 1 and notifications[0].body is not None:
+        return notifications[0].subject, notifications[0].body
+
+    latest: dict[tuple, base.Slot] = {}
+    for notification in notifications:
+        for tee_time in notification.tee_times:
+            latest[tee_time.key] = tee_time
+    tee_times = base.TeeTimes()
+    for tee_time in latest.values():
+        tee_times.add_tee_time(tee_time.to_tee_time())
+
+    if len(notifications) == 1:
+        subject = notifications[0].subject
+    else:
+        subject = f"Tee Times found for {len(notifications)} searches"
+    search_messages = "\n\n".join(
+        notification.search_message for notification in notifications
+    )
+    return subject, f"{tee_times.create_tee_time_message()}\n\n{search_messages}"
+
+
+def _is_disconnect(e: Exception) -> bool:
+    return isinstance(
+        e, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+    ) or (isinstance(e, smtplib.SMTPResponseException) and e.smtp_code == 421)
+
+
+class SMTPSession:
+    """An authenticated SMTP connection kept open across messages.
+
+    Not thread safe, each thread of `_executor` gets its own.
+    """
 
-        msg = EmailMessage()
-        msg["Subject"] = subject
-        msg["From"] = account
-        msg["To"] = recipients
-        msg.set_content(body)
+    host: str
+    port: int
+    server: smtplib.SMTP | None
 
-        server.send_message(msg)
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.server = None
 
-    finally:
-        server.quit()
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            server.ehlo()
+            if SMTP_STARTTLS:
+                # fails if the server doesn't offer it rather than going on
+                # without encryption
+                server.starttls()
+                server.ehlo()
+            if server.has_extn("auth"):
+                server.login(os.environ["GMAIL_ACCOUNT"], os.environ["GMAIL_PASSWORD"])
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def send(self, msg: EmailMessage):
+        reused = self.server is not None
+        if self.server is None:
+            self.server = self._connect()
+        try:
+            self.server.send_message(msg)
+        except Exception as e:
+            if not _is_disconnect(e):
+                raise
+            self.close()
+            # a fresh session failing isn't going to be fixed by reconnecting
+            if not reused:
+                raise
+            logger.info(f"SMTP session to {self.host} dropped, reconnecting")
+            self.server = self._connect()
+            self.server.send_message(msg)
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+        self.server = None
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=SMTP_SESSIONS, thread_name_prefix="gooker-smtp"
+)
+_local = threading.local()
+_sessions: list[SMTPSession] = []
+
+
+def _session() -> SMTPSession:
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = SMTPSession(SMTP_HOST, SMTP_PORT)
+        _sessions.append(session)
+    return session
+
+
+def _close_sessions():
+    for session in _sessions:
+        session.close()
+
+
+def send_email(subject: str, body: str, recipients: list[str]):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = SMTP_FROM or os.environ["GMAIL_ACCOUNT"]
+    msg["To"] = recipients
+    msg.set_content(body)
+
+    _session().send(msg)
 
 
 async def send_message(method: str, subject: str, body: str, recipients: list[str]):
     if method == "email":
-        send_email(subject, body, recipients)
+        await asyncio.get_running_loop().run_in_executor(
+            _executor, send_email, subject, body, recipients
+        )
+
+
+async def aclose():
+    # only called once nothing is being sent, so any thread can close them
+    await asyncio.to_thread(_close_sessions)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import random
+import time
+
+from gooker import notify
+from gooker.database import DBClient
+
+
+POLL_INTERVAL = 30  # picks up retries even when nothing new was queued
+RETRY_BASE = 30
+RETRY_MAX = 60 * 60
+MAX_ATTEMPTS = 8
+
+logger = logging.getLogger(__name__)
+
+
+def _backoff(attempts: int) -> float:
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX) * random.uniform(0.8, 1.2)
+
+
+class Dispatcher:
+    """Delivers the notifications queued in the outbox table.
+
+    Notifications are written in the same transaction as the results they
+    announce, and only removed from the outbox once sent, so a crash or a
+    failing mail server delays them rather than dropping them. Ones sent but
+    not yet removed, say while the database is locked, are never queued
+    again, and are only repeated if the process stops before they're removed.
+    Due notifications going to the same recipients are merged into a single
+    digest.
+    """
+
+    client: DBClient
+    workers: int
+    _wake: asyncio.Event
+    _stopped: bool
+    _sent: dict[int, notify.Notification]  # sent, still to be removed
+
+    def __init__(self, client: DBClient, workers: int = notify.SMTP_SESSIONS):
+        self.client = client
+        self.workers = workers
+        self._wake = asyncio.Event()
+        self._stopped = False
+        self._sent = {}
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    async def _deliver(self, notifications: list[notify.Notification]):
+        method = notifications[0].method
+        destination = notifications[0].destination
+        search_ids = ", ".join(str(n.search_id) for n in notifications)
+        try:
+            subject, body = notify.render(notifications)
+            await notify.send_message(method, subject, body, destination)
+        except Exception as e:
+            attempts = max(n.attempts for n in notifications) + 1
+            error = f"{e.__class__.__name__}: {e}"
+            if attempts >= MAX_ATTEMPTS:
+                logger.error(
+                    f"Giving up on {method} for {search_ids} after {attempts} attempts: {error}"
+                )
+                self.client.retry_notifications(notifications, None, error)
+            else:
+                delay = _backoff(attempts)
+                logger.warning(
+                    f"Failed to send {method} for {search_ids}, retrying in {int(delay)} seconds: {error}"
+                )
+                self.client.retry_notifications(
+                    notifications, time.time() + delay, error
+                )
+            return
+
+        logger.info(f"Sent {method} for {search_ids} to {destination}")
+        self._sent.update((n.id, n) for n in notifications)  # type: ignore
+        self._delete_sent()
+
+    def _delete_sent(self):
+        if not self._sent:
+            return
+        try:
+            self.client.delete_notifications(list(self._sent.values()))
+        except Exception:
+            logger.exception(
+                f"Exception encountered while removing {len(self._sent)} sent notifications, retrying next pass"
+            )
+            return
+        self._sent.clear()
+
+    async def _worker(self, queue: asyncio.Queue, in_flight: set[int]):
+        while True:
+            notifications = await queue.get()
+            try:
+                await self._deliver(notifications)
+            except Exception:
+                logger.exception("Exception encountered while sending notifications")
+            finally:
+                in_flight.difference_update(n.id for n in notifications)
+                queue.task_done()
+
+    def _queue_due(self, queue: asyncio.Queue, in_flight: set[int]):
+        digests: dict[tuple, list[notify.Notification]] = {}
+        for notification in self.client.get_due_notifications(time.time()):
+            if notification.id in in_flight or notification.id in self._sent:
+                continue
+            key = notification.digest_key or ("single", notification.id)
+            digests.setdefault(key, []).append(notification)
+
+        for notifications in digests.values():
+            in_flight.update(n.id for n in notifications)  # type: ignore
+            queue.put_nowait(notifications)
+
+    async def run(self):
+        queue: asyncio.Queue[list[notify.Notification]] = asyncio.Queue()
+        in_flight: set[int] = set()
+        workers = [
+            asyncio.create_task(self._worker(queue, in_flight))
+            for _ in range(self.workers)
+        ]
+        try:
+            while not self._stopped:
+                self._wake.clear()
+                timeout = POLL_INTERVAL
+                # e.g. the database staying locked, tried again next pass
+                try:
+                    self._delete_sent()
+                    self._queue_due(queue, in_flight)
+                    now = time.time()
+                    next_at = self.client.next_notification_at(now)
+                    if next_at is not None:
+                        timeout = min(next_at - now, timeout)
+                except Exception:
+                    logger.exception(
+                        "Exception encountered while queueing notifications"
+                    )
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # queued notifications stay in the outbox for next time, but ones
+            # being sent are finished so they aren't sent twice
+            while not queue.empty():
+                in_flight.difference_update(n.id for n in queue.get_nowait())
+                queue.task_done()
+            await queue.join()
+            self._delete_sent()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
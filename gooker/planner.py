@@ -0,0 +1,150 @@
+from dataclasses import dataclass, field
+
+from pendulum.date import Date
+from pendulum.time import Time
+
+from gooker import base
+from gooker import query
+from gooker.clients import registry
+
+
+Interval = tuple[Date, Time | None, Time | None]
+FetchKey = tuple[type[base.TeeTimeClient], Date]
+
+
+@dataclass
+class SearchDemand:
+    courses: list[base.Course]
+    intervals: list[Interval]
+    min_players: int = 4
+    max_price: int | None = None
+
+
+@dataclass
+class Fetch:
+    client: type[base.TeeTimeClient]
+    date: Date
+    courses: list[base.Course] = field(default_factory=list)
+    earliest_time: Time | None = None
+    latest_time: Time | None = None
+    min_players: int = 4
+    max_price: int | None = None
+
+    @property
+    def key(self) -> FetchKey:
+        return (self.client, self.date)
+
+
+def _widen(fetch: Fetch, demand: SearchDemand, interval: Interval):
+    _, earliest_time, latest_time = interval
+    earliest_time = earliest_time or fetch.client.default_earliest_time
+    latest_time = latest_time or fetch.client.default_latest_time
+
+    if fetch.earliest_time is None or earliest_time < fetch.earliest_time:
+        fetch.earliest_time = earliest_time
+    if fetch.latest_time is None or latest_time > fetch.latest_time:
+        fetch.latest_time = latest_time
+    fetch.min_players = min(fetch.min_players, demand.min_players)
+    if fetch.max_price is not None:
+        if demand.max_price is None:
+            fetch.max_price = None
+        else:
+            fetch.max_price = max(fetch.max_price, demand.max_price)
+
+
+def plan_fetches(demands: list[SearchDemand]) -> list[Fetch]:
+    """Merge the demands of many searches into one fetch per client and date."""
+    fetches: dict[FetchKey, Fetch] = {}
+    planned: set[tuple[FetchKey, tuple]] = set()
+    for demand in demands:
+        for course in demand.courses:
+            client = registry.client_for(course)
+            if client is None:
+                continue
+
+            for interval in demand.intervals:
+                key = (client, interval[0])
+                if key not in fetches:
+                    fetches[key] = Fetch(
+                        client=client,
+                        date=interval[0],
+                        min_players=demand.min_players,
+                        max_price=demand.max_price,
+                    )
+                fetch = fetches[key]
+                if (key, course.key) not in planned:
+                    planned.add((key, course.key))
+                    fetch.courses.append(course)
+                _widen(fetch, demand, interval)
+
+    return list(fetches.values())
+
+
+def incomplete_partitions(
+    fetches: list[Fetch], results: dict[FetchKey, base.TeeTimeBatch]
+) -> set[tuple[str, Date]]:
+    """Course names and dates that were requested but couldn't be fetched."""
+    incomplete = set()
+    for fetch in fetches:
+        batch = results.get(fetch.key)
+        incomplete.update(
+            (course.name, fetch.date)
+            for course in fetch.courses
+            if batch is None or course.key in batch.failed_courses
+        )
+    return incomplete
+
+
+def fan_out_many(
+    demands: list[SearchDemand], results: dict[FetchKey, base.TeeTimeBatch]
+) -> list[list[base.Slot]]:
+    """Select the tee times matching each search from the shared results.
+
+    Every fetched batch is scanned once, checking the filters of all the
+    searches that cover it together.
+    """
+    filters: dict[FetchKey, list[tuple[int, query.TeeTimeFilter, set[tuple]]]] = {}
+    for i, demand in enumerate(demands):
+        courses_by_client: dict[type[base.TeeTimeClient], set[tuple]] = {}
+        for course in demand.courses:
+            client = registry.client_for(course)
+            if client is not None:
+                courses_by_client.setdefault(client, set()).add(course.key)
+
+        for client, course_keys in courses_by_client.items():
+            for date, earliest_time, latest_time in demand.intervals:
+                tee_time_filter = query.TeeTimeFilter(
+                    earliest_time=earliest_time or client.default_earliest_time,
+                    latest_time=latest_time or client.default_latest_time,
+                    min_players=demand.min_players,
+                    max_price=demand.max_price,
+                    inclusive=client.capabilities.inclusive_time_window,
+                )
+                filters.setdefault((client, date), []).append(
+                    (i, tee_time_filter, course_keys)
+                )
+
+    tee_times: list[list[base.Slot]] = [[] for _ in demands]
+    for key, key_filters in filters.items():
+        batch = results.get(key)
+        if batch is None:
+            continue
+        selected = batch.select_many(
+            [
+                (tee_time_filter, course_keys)
+                for _, tee_time_filter, course_keys in key_filters
+            ]
+        )
+        for (i, _, _), rows in zip(key_filters, selected):
+            # a tee time listed at several rates is reported at the highest
+            # one the search accepts
+            tee_times[i].extend(batch.slot(row) for row in batch.dedupe(rows))
+
+    return tee_times
+
+
+def fan_out(
+    demand: SearchDemand, results: dict[FetchKey, base.TeeTimeBatch]
+) -> list[base.Slot]:
+    """Select the tee times matching a single search from the shared results."""
+    return fan_out_many([demand], results)[0]
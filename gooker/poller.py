@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import signal
+import time
+
+from gooker import scheduler
+from gooker import search
+from gooker import database
+from gooker import notify
+from gooker import outbox
+from gooker import transport
+from gooker.database import DBClient
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _sleep(stop: asyncio.Event, seconds: float) -> bool:
+    """Sleep for `seconds`, returning True early if the poller was stopped."""
+    try:
+        await asyncio.wait_for(stop.wait(), seconds)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def poll_for_tee_times():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    schedule = scheduler.Scheduler()
+    try:
+        with DBClient() as client:
+            dispatcher = outbox.Dispatcher(client)
+            delivery = asyncio.create_task(dispatcher.run())
+            try:
+                while not stop.is_set():
+                    now = time.time()
+                    schedule.sync(client.get_current_tee_time_searches(), now)
+                    due = schedule.pop_due(now)
+                    if due:
+                        # a cycle in progress is allowed to finish so it can
+                        # record what it found
+                        try:
+                            for search_, demand, diff in await search.check_for_times(
+                                client, due
+                            ):
+                                schedule.record(search_, demand, diff, time.time())
+                        except Exception:
+                            logger.exception(
+                                "Exception encountered while checking for times"
+                            )
+                            schedule.defer(due, time.time(), scheduler.MIN_INTERVAL)
+                        dispatcher.wake()
+
+                    # wake up at least every MIN_INTERVAL to pick up new searches
+                    next_due = schedule.next_due()
+                    sleep_time = scheduler.MIN_INTERVAL
+                    if next_due is not None:
+                        sleep_time = min(max(next_due - time.time(), 1), sleep_time)
+                    logger.info(
+                        f"sleeping for {int(sleep_time)//60} minutes {int(sleep_time)%60} seconds"
+                    )
+                    if await _sleep(stop, sleep_time):
+                        break
+            finally:
+                dispatcher.stop()
+                await delivery
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(sig)
+        await transport.aclose()
+        await notify.aclose()
+        database.close()
+        logger.info("Stopped polling for tee times")
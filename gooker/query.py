@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+
+from pendulum.time import Time
+
+
+@dataclass(frozen=True)
+class ProviderCapabilities:
+    """Which tee time filters a provider's API can apply server side."""
+
+    # granularity in minutes of the start time window the API accepts, or None
+    # if it can't filter by time. The API is expected to return everything from
+    # the earliest time's granule through the latest time's granule.
+    time_granularity: int | None = None
+    # whether the API only returns tee times with at least N open spots
+    min_players: bool = False
+    # whether the API only returns tee times at or below a price
+    max_price: bool = False
+    # whether tee times exactly at a search's earliest or latest time match it,
+    # searches are otherwise exclusive of both ends
+    inclusive_time_window: bool = False
+
+
+@dataclass(frozen=True)
+class ProviderQuery:
+    """Filters to send to a provider, None where the provider can't apply one."""
+
+    earliest_time: Time | None = None
+    latest_time: Time | None = None
+    min_players: int | None = None
+    max_price: int | None = None
+
+
+@dataclass(frozen=True)
+class TeeTimeFilter:
+    """Predicate applied locally, None where no check is needed."""
+
+    earliest_time: Time | None = None
+    latest_time: Time | None = None
+    min_players: int | None = None
+    max_price: int | None = None
+    inclusive: bool = False  # whether the time window includes its ends
+
+
+def _floor_time(val: Time, granularity: int) -> Time:
+    minutes = (val.hour * 60 + val.minute) // granularity * granularity
+    return Time(minutes // 60, minutes % 60)
+
+
+def plan_query(
+    capabilities: ProviderCapabilities,
+    earliest_time: Time,
+    latest_time: Time,
+    min_players: int,
+    max_price: int | None,
+) -> tuple[ProviderQuery, TeeTimeFilter]:
+    """Push as much of a search down to the provider as it supports.
+
+    Returns the query to send and the residual filter for whatever the
+    provider can't apply exactly. Pushed down filters are never stricter
+    than the search, so the results are the same as filtering locally.
+    """
+    query_earliest_time = query_latest_time = None
+    if capabilities.time_granularity:
+        query_earliest_time = _floor_time(earliest_time, capabilities.time_granularity)
+        query_latest_time = _floor_time(latest_time, capabilities.time_granularity)
+
+    query = ProviderQuery(
+        earliest_time=query_earliest_time,
+        latest_time=query_latest_time,
+        min_players=min_players if capabilities.min_players else None,
+        max_price=max_price if capabilities.max_price else None,
+    )
+    # provider time windows are floored to their granularity and inclusive,
+    # so the time window is always checked locally
+    residual = TeeTimeFilter(
+        earliest_time=earliest_time,
+        latest_time=latest_time,
+        min_players=None if capabilities.min_players else min_players,
+        max_price=None if capabilities.max_price else max_price,
+        inclusive=capabilities.inclusive_time_window,
+    )
+    return query, residual
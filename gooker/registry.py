@@ -0,0 +1,104 @@
+from functools import lru_cache
+from typing import Hashable, Protocol
+
+from gooker import base
+
+
+class CourseGroupSource(Protocol):
+    def get_course_group(self, course_group: str) -> list[str] | None:
+        ...
+
+    def course_groups_version(self) -> Hashable:
+        ...
+
+
+class CourseRegistry:
+    """Indexes of every course offered by the clients, built once at import."""
+
+    courses: list[base.Course]
+    names: list[str]
+    _by_name: dict[str, base.Course]
+    _clients: dict[tuple[str, int | str], type[base.TeeTimeClient]]
+    _positions: dict[str, int]
+    _by_attribute: dict[tuple[str, bool], frozenset[str]]
+    _course_groups: dict[str, tuple[Hashable, list[str] | None]]
+
+    def __init__(self, clients: list[type[base.TeeTimeClient]]):
+        self.courses = [course for client in clients for course in client.courses]
+        self.names = [course.name for course in self.courses]
+        self._by_name = {course.name: course for course in self.courses}
+        self._clients = {
+            course.key: client for client in clients for course in client.courses
+        }
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        self._by_attribute = {
+            (attribute, value): frozenset(
+                course.name
+                for course in self.courses
+                if getattr(course, attribute) == value
+            )
+            for attribute in ("is_9_hole", "is_par_70_plus", "is_par_3")
+            for value in (True, False)
+        }
+        self._course_groups = {}
+
+    def get(self, name: str) -> base.Course | None:
+        return self._by_name.get(name)
+
+    def client_for(self, course: base.Course) -> type[base.TeeTimeClient] | None:
+        return self._clients.get(course.key)
+
+    def with_attribute(self, attribute: str, value: bool = True) -> frozenset[str]:
+        return self._by_attribute[(attribute, value)]
+
+    def filter(
+        self,
+        names: list[str] | None,
+        par_70_plus: bool,
+        eighteen_holes: bool,
+        nine_holes: bool,
+    ) -> list[base.Course]:
+        return list(
+            self._filter(
+                tuple(names) if names is not None else None,
+                par_70_plus,
+                eighteen_holes,
+                nine_holes,
+            )
+        )
+
+    @lru_cache(maxsize=256)
+    def _filter(
+        self,
+        names: tuple[str, ...] | None,
+        par_70_plus: bool,
+        eighteen_holes: bool,
+        nine_holes: bool,
+    ) -> tuple[base.Course, ...]:
+        matching = (
+            frozenset(names).intersection(self._by_name)
+            if names is not None
+            else frozenset(self.names)
+        )
+        if par_70_plus:
+            matching &= self.with_attribute("is_par_70_plus")
+        if eighteen_holes:
+            matching &= self.with_attribute("is_9_hole", False)
+        if nine_holes:
+            matching &= self.with_attribute("is_9_hole")
+
+        return tuple(
+            self._by_name[name]
+            for name in sorted(matching, key=self._positions.__getitem__)
+        )
+
+    def get_course_group(
+        self, db: CourseGroupSource, course_group: str
+    ) -> list[str] | None:
+        # groups edited from the CLI while the poller runs invalidate the cache
+        version = db.course_groups_version()
+        cached = self._course_groups.get(course_group)
+        if cached is None or cached[0] != version:
+            cached = (version, db.get_course_group(course_group))
+            self._course_groups[course_group] = cached
+        return cached[1]
@@ -0,0 +1,161 @@
+import heapq
+import logging
+import os
+import random
+import uuid
+
+import pendulum
+from pendulum.date import Date
+
+from gooker import base
+from gooker import planner
+from gooker.diff import TeeTimeDiff
+
+
+MIN_INTERVAL = 60 * 3
+MAX_INTERVAL = 60 * 30
+HORIZON_DAYS = 14  # searches this far out or more are polled at MAX_INTERVAL
+REQUEST_BUDGET = float(os.environ.get("GOOKER_REQUEST_BUDGET", 600))  # per hour
+CHANGE_RATE_ALPHA = 0.3  # weight of the latest check in the change rate average
+MERGE_SLACK = 30  # seconds early any search may be checked to join a cycle
+# fraction of its interval early a search may be checked to join a cycle that
+# fetches some of the same clients and dates
+MERGE_WINDOW = 0.25
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """Priority queue deciding when each search is next polled.
+
+    A search's interval shrinks as its start date approaches and as the
+    courses/dates it covers change more often, and all intervals are
+    stretched evenly when their combined provider requests would exceed
+    REQUEST_BUDGET per hour.
+
+    Searches coming due soon are checked early alongside due ones they
+    share fetches with, so overlapping searches keep being merged into the
+    same provider requests instead of drifting apart.
+    """
+
+    _heap: list[tuple[float, uuid.UUID]]
+    _due: dict[uuid.UUID, float]
+    _intervals: dict[uuid.UUID, float]
+    _fetch_keys: dict[uuid.UUID, set[planner.FetchKey]]
+    _change_rates: dict[tuple[str, Date], float]
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+        self._intervals = {}
+        self._fetch_keys = {}
+        self._change_rates = {}
+
+    def _schedule(self, id: uuid.UUID, due: float):
+        self._due[id] = due
+        heapq.heappush(self._heap, (due, id))
+
+    def sync(self, searches: list[base.TeeTimeSearch], now: float):
+        ids = {search.id for search in searches}
+        for id in list(self._due):
+            if id not in ids:
+                del self._due[id]
+                self._intervals.pop(id, None)
+                self._fetch_keys.pop(id, None)
+        for id in ids:
+            if id not in self._due:
+                self._schedule(id, now)
+
+    def pop_due(self, now: float) -> set[uuid.UUID]:
+        due = set()
+        while self._heap and self._heap[0][0] <= now:
+            due_at, id = heapq.heappop(self._heap)
+            if self._due.get(id) == due_at:
+                del self._due[id]
+                due.add(id)
+        if not due:
+            return due
+
+        # entries left in the heap for searches pulled in here are skipped later
+        fetch_keys = set().union(*(self._fetch_keys.get(id, ()) for id in due))
+        for id, due_at in list(self._due.items()):
+            if due_at - now <= MERGE_SLACK or (
+                due_at - now <= MERGE_WINDOW * self._intervals.get(id, 0)
+                and not fetch_keys.isdisjoint(self._fetch_keys.get(id, ()))
+            ):
+                del self._due[id]
+                due.add(id)
+        return due
+
+    def next_due(self) -> float | None:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def defer(self, ids: set[uuid.UUID], now: float, seconds: float):
+        for id in ids:
+            self._schedule(id, now + seconds)
+
+    def _change_rate(self, demand: planner.SearchDemand) -> float:
+        return max(
+            (
+                self._change_rates.get((course.name, date), 0)
+                for course in demand.courses
+                for date, _, _ in demand.intervals
+            ),
+            default=0,
+        )
+
+    def _record_changes(self, demand: planner.SearchDemand, diff: TeeTimeDiff):
+        changed = {
+            (tee_time.course.name, tee_time.tee_time.date())
+            for tee_time in diff.added + diff.removed + [new for _, new in diff.changed]
+        }
+        for course in demand.courses:
+            for date, _, _ in demand.intervals:
+                key = (course.name, date)
+                rate = self._change_rates.get(key, 0)
+                self._change_rates[key] = (
+                    1 - CHANGE_RATE_ALPHA
+                ) * rate + CHANGE_RATE_ALPHA * (key in changed)
+
+    def _base_interval(
+        self, search: base.TeeTimeSearch, demand: planner.SearchDemand
+    ) -> float:
+        days_out = (search.search_params.start_date - pendulum.now().date()).days
+        urgency = min(max(days_out, 0), HORIZON_DAYS) / HORIZON_DAYS
+        interval = MIN_INTERVAL + urgency * (MAX_INTERVAL - MIN_INTERVAL)
+        # frequently changing courses/dates are worth checking up to twice as often
+        return interval * (1 - self._change_rate(demand) / 2)
+
+    def _budget_scale(self) -> float:
+        # searches sharing a fetch are checked together, so each fetch costs
+        # one request per interval of the most frequently checked of them
+        intervals: dict[planner.FetchKey, float] = {}
+        for id, fetch_keys in self._fetch_keys.items():
+            for key in fetch_keys:
+                intervals[key] = min(
+                    intervals.get(key, self._intervals[id]), self._intervals[id]
+                )
+        load = sum(3600 / interval for interval in intervals.values())
+        return max(load / REQUEST_BUDGET, 1)
+
+    def record(
+        self,
+        search: base.TeeTimeSearch,
+        demand: planner.SearchDemand,
+        diff: TeeTimeDiff,
+        now: float,
+    ):
+        self._record_changes(demand, diff)
+        self._intervals[search.id] = self._base_interval(search, demand)
+        self._fetch_keys[search.id] = {
+            fetch.key for fetch in planner.plan_fetches([demand])
+        }
+
+        interval = self._intervals[search.id] * self._budget_scale()
+        interval *= random.uniform(0.9, 1.1)
+        logger.info(
+            f"Next check for {search.id} in {int(interval)//60} minutes {int(interval)%60} seconds"
+        )
+        self._schedule(search.id, now + interval)
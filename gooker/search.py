@@ -1,6 +1,9 @@
+from contextlib import AsyncExitStack
+from typing import AsyncIterator
 import logging
 import asyncio
 import datetime
+import uuid
 
 import pendulum
 from pendulum.date import Date
@@ -8,7 +11,11 @@ from pendulum.time import Time
 
 from gooker import notify
 from gooker import base
-from gooker.clients import clients
+from gooker import cache
+from gooker import diff
+from gooker import planner
+from gooker import transport
+from gooker.clients import registry
 from gooker.database import DBClient
 
 
@@ -44,139 +51,180 @@ def _build_itervals(
     return intervals
 
 
-def _filter_courses(
-    base_courses: list[base.Course],
-    par_70_plus: bool,
-    eighteen_holes: bool,
-    nine_holes: bool,
+def _resolve_courses(
+    search: base.TeeTimeSearchParams, db: DBClient | None = None
 ) -> list[base.Course]:
-    courses = []
-    for course in base_courses:
-        if par_70_plus and not course.is_par_70_plus:
-            continue
-        if eighteen_holes and course.is_9_hole:
-            continue
-        if nine_holes and not course.is_9_hole:
-            continue
-        courses.append(course)
-
-    return courses
-
-
-async def find_tee_times(search: base.TeeTimeSearchParams) -> list[base.TeeTime]:
-    tee_times = base.TeeTimes()
-    intervals = _build_itervals(
-        search.start_date,
-        search.start_time,
-        search.end_date,
-        search.end_time,
-        search.earliest_time,
-        search.latest_time,
-    )
-
     if search.course_group:
-        with DBClient() as client:
-            course_list = client.get_course_group(search.course_group)
+        if db is None:
+            with DBClient() as client:
+                course_list = registry.get_course_group(client, search.course_group)
+        else:
+            course_list = registry.get_course_group(db, search.course_group)
     elif search.courses:
         course_list = search.courses
     else:
         course_list = None
 
-    courses = _filter_courses(
-        [
-            course
-            for client in clients
-            for course in client.courses
-            if course_list is None or course.name in course_list
-        ],
+    return registry.filter(
+        course_list,
         search.par_70_plus,
         search.eighteen_holes,
         search.nine_holes,
     )
 
-    async def _get_client_tee_times(
-        client: type[base.TeeTimeClient],
-        intervals: list[tuple[Date, Time | None, Time | None]],
-        courses: list[base.Course],
-        min_players: int = 4,
-        earliest_time: Time | None = None,
-        latest_time: Time | None = None,
-        max_price: int | None = None,
-    ) -> list[base.TeeTime]:
-        client_tee_times: list[base.TeeTime] = []
-        async with client() as c:
-            for date, earliest_time, latest_time in intervals:
-                try:
-                    client_tee_times.extend(
-                        await c.get_tee_times(
-                            courses=courses,
-                            date=date,
-                            earliest_time=earliest_time,
-                            latest_time=latest_time,
-                            min_players=min_players,
-                            max_price=max_price,
-                        )
-                    )
-                except Exception as e:
-                    logger.warning(f"Exception encountered while running {client.__name__} for {date}: {e.__class__.__name__}")  # type: ignore
-
-        return client_tee_times
-
-    tee_times = []
-    for tee_time_list in await asyncio.gather(
-        *[
-            _get_client_tee_times(
-                client,
-                intervals,
-                courses,
-                search.min_players,
-                search.earliest_time,
-                search.latest_time,
-                search.max_price,
-            )
-            for client in clients
+
+def _build_demand(
+    search: base.TeeTimeSearchParams, db: DBClient | None = None
+) -> planner.SearchDemand:
+    return planner.SearchDemand(
+        courses=_resolve_courses(search, db),
+        intervals=_build_itervals(
+            search.start_date,
+            search.start_time,
+            search.end_date,
+            search.end_time,
+            search.earliest_time,
+            search.latest_time,
+        ),
+        min_players=search.min_players,
+        max_price=search.max_price,
+    )
+
+
+async def _iter_fetches(
+    fetches: list[planner.Fetch],
+) -> AsyncIterator[tuple[planner.Fetch, base.TeeTimeBatch]]:
+    semaphores = {
+        fetch.client: asyncio.Semaphore(fetch.client.max_concurrency)
+        for fetch in fetches
+    }
+
+    async def _get_fetch_tee_times(
+        c: base.TeeTimeClient, fetch: planner.Fetch
+    ) -> tuple[planner.Fetch, base.TeeTimeBatch | None]:
+        async with semaphores[fetch.client]:
+            try:
+                return fetch, await c.get_tee_times(
+                    courses=fetch.courses,
+                    date=fetch.date,
+                    earliest_time=fetch.earliest_time,
+                    latest_time=fetch.latest_time,
+                    min_players=fetch.min_players,
+                    max_price=fetch.max_price,
+                )
+            except Exception as e:
+                logger.warning(f"Exception encountered while running {fetch.client.__name__} for {fetch.date}: {e.__class__.__name__}")  # type: ignore
+                return fetch, None
+
+    async with AsyncExitStack() as stack:
+        instances = {
+            client: await stack.enter_async_context(client()) for client in semaphores
+        }
+        tasks = [
+            asyncio.ensure_future(_get_fetch_tee_times(instances[fetch.client], fetch))
+            for fetch in fetches
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                fetch, tee_times = await task
+                if tee_times is not None:
+                    yield fetch, tee_times
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    logger.info(f"Ran {len(fetches)} provider fetches")
+    logger.info(f"Response cache: {cache.response_cache.stats}")
+    logger.info(f"Provider health: {transport.health()}")
+
+
+async def _run_fetches(
+    fetches: list[planner.Fetch],
+) -> dict[planner.FetchKey, base.TeeTimeBatch]:
+    return {fetch.key: tee_times async for fetch, tee_times in _iter_fetches(fetches)}
+
+
+async def iter_tee_times(
+    search: base.TeeTimeSearchParams,
+) -> AsyncIterator[list[base.TeeTime]]:
+    """Yield matching tee times per provider and date as soon as each is parsed."""
+    demand = _build_demand(search)
+    async for fetch, tee_times in _iter_fetches(planner.plan_fetches([demand])):
+        yield [
+            tee_time.to_tee_time()
+            for tee_time in planner.fan_out(demand, {fetch.key: tee_times})
         ]
-    ):
-        tee_times.extend(tee_time_list)
 
-    return tee_times
 
+async def find_tee_times(search: base.TeeTimeSearchParams) -> list[base.TeeTime]:
+    demand = _build_demand(search)
+    results = await _run_fetches(planner.plan_fetches([demand]))
+    return [tee_time.to_tee_time() for tee_time in planner.fan_out(demand, results)]
 
-async def check_for_times(client: DBClient):
-    cur_searches = client.get_current_tee_time_searches()
-    logger.info(f"Found {len(cur_searches)} current searches")
-    for search in cur_searches:
-        if search.search_params.end_date < pendulum.now().date():
-            logger.info(
-                f"Deleting search {search.id} as {search.search_params.end_date} has passed"
-            )
-            client.delete_tee_time_search(search)
-            continue
 
+async def check_for_times(
+    client: DBClient, search_ids: set[uuid.UUID] | None = None
+) -> list[tuple[base.TeeTimeSearch, planner.SearchDemand, diff.TeeTimeDiff]]:
+    for id in client.delete_expired_tee_time_searches(pendulum.now().date()):
+        logger.info(f"Deleted search {id} as its end date has passed")
+
+    active_searches = []
+    for search, cur_results in client.get_tee_time_searches_with_results(search_ids):
+        active_searches.append(
+            (search, _build_demand(search.search_params, client), cur_results)
+        )
+    logger.info(f"Checking {len(active_searches)} current searches")
+
+    fetches = planner.plan_fetches([demand for _, demand, _ in active_searches])
+    results = await _run_fetches(fetches)
+    incomplete = planner.incomplete_partitions(fetches, results)
+    if incomplete:
+        logger.info(
+            f"Keeping stored tee times for {len(incomplete)} courses/dates that couldn't be fetched"
+        )
+
+    all_client_results = planner.fan_out_many(
+        [demand for _, demand, _ in active_searches], results
+    )
+
+    checked = []
+    for (search, demand, cur_results), client_results in zip(
+        active_searches, all_client_results
+    ):
         logger.info(f"Checking for new tee times for {search.id}")
-        cur_results = client.get_current_tee_time_search_results(search.id)
-        client_results = await find_tee_times(search.search_params)
-        new_results = [t for t in client_results if t not in cur_results]
-        missing_results = [t for t in cur_results if t not in client_results]
-
-        if new_results:
-            logger.info(f"Found {len(new_results)} new tee times for {search.id}")
-            tee_times = base.TeeTimes()
-            for t in new_results:
-                tee_times.add_tee_time(t)
+        results_diff = diff.diff_tee_times(cur_results, client_results, incomplete)
+
+        notification = None
+        if results_diff.added:
             logger.info(
-                f"Sending {search.notification_method} for {search.id} to {search.notification_destination}"
+                f"Found {len(results_diff.added)} new tee times for {search.id}"
             )
-            await notify.send_message(
-                search.notification_method,
-                f"Tee Times found for {search.id}",
-                f"{tee_times.create_tee_time_message()}\n\n{search.search_params.create_search_param_message()}",
-                search.notification_destination,
+            logger.info(
+                f"Queueing {search.notification_method} for {search.id} to {search.notification_destination}"
+            )
+            notification = notify.Notification(
+                search_id=search.id,
+                method=search.notification_method,
+                destination=search.notification_destination,
+                subject=f"Tee Times found for {search.id}",
+                tee_times=results_diff.added,
+                search_message=search.search_params.create_search_param_message(),
             )
-            client.insert_tee_time_search_results(search.id, new_results)
         else:
             logger.info(f"Found no new tee times for {search.id}")
 
-        if missing_results:
-            logger.info(f"Deleting {len(missing_results)} tee_times for {search.id}")
-            client.delete_tee_time_search_results(search.id, missing_results)
+        if results_diff.removed:
+            logger.info(
+                f"Deleting {len(results_diff.removed)} tee_times for {search.id}"
+            )
+        if results_diff.changed:
+            logger.info(
+                f"Updating {len(results_diff.changed)} changed tee_times for {search.id}"
+            )
+        if results_diff:
+            client.apply_tee_time_search_diff(search.id, results_diff, notification)
+
+        checked.append((search, demand, results_diff))
+
+    return checked
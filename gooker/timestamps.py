@@ -0,0 +1,62 @@
+from functools import lru_cache
+import datetime
+
+import pendulum
+from pendulum.datetime import DateTime
+
+
+LOCAL_TZ = pendulum.timezone("America/Los_Angeles")
+CACHE_SIZE = 16384  # tee times repeat across courses, searches and cycles
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_local(val: str) -> DateTime:
+    """Parse a local `YYYY-MM-DD HH:mm[:ss]` or `YYYY-MM-DDTHH:mm[:ss]` timestamp.
+
+    Used for ForeUp, EZLinks and LetsGoGolf responses. Anything else falls
+    back to pendulum's parser.
+    """
+    if (
+        len(val) in (16, 19)
+        and val[4] == "-"
+        and val[7] == "-"
+        and val[10] in "T "
+        and val[13] == ":"
+        and (len(val) == 16 or val[16] == ":")
+    ):
+        try:
+            return pendulum.datetime(
+                int(val[0:4]),
+                int(val[5:7]),
+                int(val[8:10]),
+                int(val[11:13]),
+                int(val[14:16]),
+                int(val[17:19]) if len(val) == 19 else 0,
+                tz=LOCAL_TZ,
+            )
+        except ValueError:
+            pass
+
+    return pendulum.parser.parse(val, tz=LOCAL_TZ)  # type: ignore
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_utc(val: str) -> DateTime:
+    """Parse an ISO 8601 timestamp with an offset into local time.
+
+    Used for TeeItUp responses, which are in UTC.
+    """
+    if val.endswith("Z"):
+        val = val[:-1] + "+00:00"
+    try:
+        return pendulum.instance(datetime.datetime.fromisoformat(val)).in_timezone(
+            LOCAL_TZ
+        )
+    except ValueError:
+        return pendulum.parser.parse(val).in_timezone(LOCAL_TZ)  # type: ignore
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def from_epoch(val: int) -> DateTime:
+    """Local time for a unix timestamp, as stored in the database."""
+    return pendulum.from_timestamp(val, tz=LOCAL_TZ)
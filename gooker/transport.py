@@ -0,0 +1,366 @@
+from functools import cache
+from typing import Callable
+from email.utils import parsedate_to_datetime
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import time
+
+from httpx import URL, AsyncClient, Limits, Response, Timeout, TransportError
+
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/110.0"
+HTTP2 = os.environ.get("GOOKER_HTTP2", "").lower() in ("1", "true", "yes")
+KEEPALIVE_EXPIRY = float(os.environ.get("GOOKER_KEEPALIVE_EXPIRY", 300))
+# starting points, at least what every client used to send unthrottled
+RATE_LIMIT = float(os.environ.get("GOOKER_RATE_LIMIT", 16))  # requests per second
+HOST_CONCURRENCY = int(os.environ.get("GOOKER_HOST_CONCURRENCY", 8))
+MAX_RATE_LIMIT = float(os.environ.get("GOOKER_MAX_RATE_LIMIT", 32))
+MAX_HOST_CONCURRENCY = int(os.environ.get("GOOKER_MAX_HOST_CONCURRENCY", 16))
+TARGET_LATENCY = float(os.environ.get("GOOKER_TARGET_LATENCY", 5))  # seconds
+CONNECT_TIMEOUT = float(
+    os.environ.get("GOOKER_CONNECT_TIMEOUT", 10)
+)  # also bounds probes
+MAX_RETRIES = int(os.environ.get("GOOKER_MAX_RETRIES", 2))
+RETRY_BASE = 0.5  # seconds, doubled on every retry
+MAX_RETRY_AFTER = 30  # don't retry if asked to wait longer than this
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+BREAKER_THRESHOLD = int(os.environ.get("GOOKER_BREAKER_THRESHOLD", 5))
+BREAKER_COOLDOWN = float(os.environ.get("GOOKER_BREAKER_COOLDOWN", 30))
+MAX_BREAKER_COOLDOWN = 60 * 10
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def _http2_available() -> bool:
+    if not HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("GOOKER_HTTP2 is set but h2 is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+def _parse_retry_after(val: str | None) -> float | None:
+    if not val:
+        return None
+    try:
+        return max(float(val), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(val).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class Limiter:
+    """Token bucket with an AIMD controlled concurrency limit.
+
+    Successful, fast responses additively raise the request rate and the
+    number of requests allowed in flight. Throttling (429), server errors
+    and slow responses halve both. A `Retry-After` header pauses the host
+    entirely until it expires.
+    """
+
+    rate: float
+    limit: float
+    _initial: tuple[float, float]
+    _tokens: float
+    _updated: float
+    _in_flight: int
+    _paused_until: float
+    _cond: asyncio.Condition | None
+    _loop: asyncio.AbstractEventLoop | None
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT,
+        limit: float = min(HOST_CONCURRENCY, MAX_HOST_CONCURRENCY),
+    ):
+        self.rate = rate
+        self.limit = limit
+        self._initial = (rate, limit)
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._paused_until = 0
+        self._cond = None
+        self._loop = None
+
+    @property
+    def cond(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+            self._in_flight = 0
+        return self._cond
+
+    def _refill(self, now: float):
+        self._tokens = min(
+            max(self.rate, 1), self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, abandon: Callable[[], bool] = lambda: False) -> bool:
+        """Wait for a request slot, giving up if `abandon` becomes true."""
+        cond = self.cond
+        async with cond:
+            while True:
+                if abandon():
+                    return False
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    timeout = self._paused_until - now
+                elif self._in_flight >= int(self.limit):
+                    timeout = None
+                elif self._tokens < 1:
+                    timeout = (1 - self._tokens) / self.rate
+                else:
+                    self._tokens -= 1
+                    self._in_flight += 1
+                    return True
+
+                try:
+                    await asyncio.wait_for(cond.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, latency: float, status_code: int | None):
+        cond = self.cond
+        async with cond:
+            self._in_flight = max(self._in_flight - 1, 0)
+            if (
+                status_code is None
+                or status_code == 429
+                or status_code >= 500
+                or latency > TARGET_LATENCY
+            ):
+                self.limit = max(self.limit / 2, 1)
+                self.rate = max(self.rate / 2, 0.5)
+            else:
+                self.limit = min(self.limit + 1 / self.limit, MAX_HOST_CONCURRENCY)
+                self.rate = min(self.rate + 1 / self.rate, MAX_RATE_LIMIT)
+            cond.notify_all()
+
+    def reset(self):
+        self.rate, self.limit = self._initial
+
+    async def wake(self):
+        cond = self.cond
+        async with cond:
+            cond.notify_all()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host that is failing."""
+
+
+class CircuitBreaker:
+    """Stops sending requests to a host after repeated failures.
+
+    After BREAKER_THRESHOLD failures in a row the circuit opens and requests
+    fail immediately. Once the cooldown passes a single probe request is let
+    through: success closes the circuit, failure reopens it with double the
+    cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    name: str
+    state: str
+    failures: int
+    cooldown: float
+    _opened_at: float
+    _probing: bool
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self._opened_at = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Raise if requests shouldn't be sent, returns whether this is a probe."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                raise CircuitOpenError(f"Circuit for {self.name} is open")
+            logger.info(f"Probing {self.name} after {int(self.cooldown)}s")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(f"Circuit for {self.name} is half-open")
+            self._probing = True
+            return True
+        return False
+
+    def end_probe(self):
+        self._probing = False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"{self.name} recovered, closing circuit")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, MAX_BREAKER_COOLDOWN)
+        elif self.state == self.OPEN or self.failures < BREAKER_THRESHOLD:
+            return
+        logger.warning(
+            f"Opening circuit for {self.name} after {self.failures} failures, retrying in {int(self.cooldown)}s"
+        )
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+
+
+def _backoff(attempt: int) -> float:
+    return RETRY_BASE * 2**attempt * random.uniform(0.5, 1.5)
+
+
+class Host:
+    """Connection pool shared by every client talking to a single host."""
+
+    name: str
+    limiter: Limiter
+    breaker: CircuitBreaker
+    _client: AsyncClient | None
+    _loop: asyncio.AbstractEventLoop | None
+
+    def __init__(self, name: str):
+        self.name = name
+        self.limiter = Limiter()
+        self.breaker = CircuitBreaker(name)
+        self._client = None
+        self._loop = None
+
+    @property
+    def client(self) -> AsyncClient:
+        # connections belong to the event loop they were opened on, so a pool
+        # left over from a previous loop can't be reused
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                verify=False,
+                timeout=Timeout(120, connect=CONNECT_TIMEOUT),
+                limits=Limits(keepalive_expiry=KEEPALIVE_EXPIRY),
+                http2=_http2_available(),
+            )
+            self._loop = loop
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        """Send a request, retrying transient errors with jittered backoff.
+
+        Raises CircuitOpenError without sending anything while the host is
+        considered down.
+        """
+        attempt = 0
+        while True:
+            probe = self.breaker.allow()
+            try:
+                res = await self._send(method, url, probe, **kwargs)
+            except TransportError as e:
+                await self._record_failure()
+                if not self._should_retry(attempt):
+                    raise
+                logger.info(f"{self.name} {e.__class__.__name__}, retrying")
+            else:
+                if res.status_code >= 500:
+                    await self._record_failure()
+                elif self.breaker.state != CircuitBreaker.CLOSED:
+                    # the rate was cut to nothing while the host was down
+                    self.breaker.record_success()
+                    self.limiter.reset()
+                else:
+                    self.breaker.record_success()
+                if res.status_code not in RETRY_STATUS_CODES or not self._should_retry(
+                    attempt
+                ):
+                    return res
+                retry_after = _parse_retry_after(res.headers.get("Retry-After"))
+                if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                    return res
+                logger.info(f"{self.name} responded {res.status_code}, retrying")
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+
+    async def _record_failure(self):
+        self.breaker.record_failure()
+        if self.breaker.state == CircuitBreaker.OPEN:
+            # requests waiting on the limiter give up instead of being sent
+            await self.limiter.wake()
+
+    def _should_retry(self, attempt: int) -> bool:
+        # a probe or a request that opened the circuit isn't retried
+        return attempt < MAX_RETRIES and self.breaker.state == CircuitBreaker.CLOSED
+
+    async def _send(self, method: str, url: str, probe: bool, **kwargs) -> Response:
+        if not await self.limiter.acquire(
+            lambda: not probe and self.breaker.state == CircuitBreaker.OPEN
+        ):
+            raise CircuitOpenError(f"Circuit for {self.name} is open")
+        if probe:
+            # a host accepting connections and then hanging can't stall a cycle
+            kwargs["timeout"] = CONNECT_TIMEOUT
+        start = time.monotonic()
+        status_code = None
+        try:
+            res = await self.client.request(method, url, **kwargs)
+            status_code = res.status_code
+        finally:
+            await self.limiter.release(time.monotonic() - start, status_code)
+
+        if status_code == 429 or status_code >= 500:
+            retry_after = _parse_retry_after(res.headers.get("Retry-After"))
+            if retry_after is not None:
+                logger.info(f"{self.name} asked us to back off for {retry_after}s")
+                self.limiter.pause(retry_after)
+
+        return res
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+_hosts: dict[str, Host] = {}
+
+
+def get_host(url: str) -> Host:
+    name = URL(url).host
+    if name not in _hosts:
+        _hosts[name] = Host(name)
+    return _hosts[name]
+
+
+def health() -> dict[str, str]:
+    """Circuit state of every host talked to so far."""
+    return {name: host.breaker.state for name, host in _hosts.items()}
+
+
+async def aclose():
+    for host in _hosts.values():
+        await host.aclose()
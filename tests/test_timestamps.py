@@ -0,0 +1,86 @@
+import pendulum
+import pytest
+from pendulum.datetime import DateTime
+
+from gooker import timestamps
+
+
+LOCAL = [
+    # ForeUp
+    ("2026-10-17 06:30", "YYYY-MM-DD HH:mm"),
+    ("2026-10-17 18:59", "YYYY-MM-DD HH:mm"),
+    # EZLinks
+    ("2026-10-17T06:30:00", "YYYY-MM-DDTHH:mm:ss"),
+    ("2026-12-31T23:59:59", "YYYY-MM-DDTHH:mm:ss"),
+    # LetsGoGolf, once its trailing Z is stripped
+    ("2026-10-17T06:10:00", "YYYY-MM-DDTHH:mm:ss"),
+    # spring forward, 2:00-3:00 doesn't exist
+    ("2026-03-08 01:59", "YYYY-MM-DD HH:mm"),
+    ("2026-03-08 02:30", "YYYY-MM-DD HH:mm"),
+    ("2026-03-08 03:00", "YYYY-MM-DD HH:mm"),
+    # fall back, 1:00-2:00 happens twice
+    ("2026-11-01 00:59", "YYYY-MM-DD HH:mm"),
+    ("2026-11-01T01:30:00", "YYYY-MM-DDTHH:mm:ss"),
+    ("2026-11-01 02:00", "YYYY-MM-DD HH:mm"),
+    # not the fast path's format
+    ("2026-10-17T06:30:00.250", "YYYY-MM-DDTHH:mm:ss.SSS"),
+]
+
+UTC = [
+    # TeeItUp
+    "2026-10-17T13:20:00.000Z",
+    "2026-10-17T13:20:00Z",
+    "2026-10-17T13:20:00.123456Z",
+    "2026-10-17T13:20:00+00:00",
+    "2026-10-17T06:20:00-07:00",
+    "2026-10-17T18:50:00+05:30",
+    # around spring forward (10:00 UTC) and fall back (09:00 UTC)
+    "2026-03-08T09:59:00.000Z",
+    "2026-03-08T10:00:00.000Z",
+    "2026-11-01T08:30:00.000Z",
+    "2026-11-01T09:30:00.000Z",
+]
+
+
+def assert_same(actual: DateTime, expected: DateTime):
+    assert isinstance(actual, DateTime)
+    assert actual == expected
+    assert actual.utcoffset() == expected.utcoffset()
+    assert actual.isoformat() == expected.isoformat()
+
+
+@pytest.mark.parametrize("val,fmt", LOCAL)
+def test_parse_local_matches_from_format(val, fmt):
+    expected = pendulum.from_format(val, fmt, tz=timestamps.LOCAL_TZ)
+    assert_same(timestamps.parse_local(val), expected)
+
+
+@pytest.mark.parametrize("val,fmt", LOCAL)
+def test_parse_local_matches_parser(val, fmt):
+    expected = pendulum.parser.parse(val, tz=timestamps.LOCAL_TZ)
+    assert_same(timestamps.parse_local(val), expected)
+
+
+@pytest.mark.parametrize("val", UTC)
+def test_parse_utc_matches_parser(val):
+    expected = pendulum.parser.parse(val).in_timezone(timestamps.LOCAL_TZ)
+    assert_same(timestamps.parse_utc(val), expected)
+
+
+@pytest.mark.parametrize(
+    "val", ["2026-10-17T13:20:00.000Z", "2026-03-08T10:00:00.000Z"]
+)
+def test_parse_utc_matches_from_format(val):
+    expected = pendulum.from_format(
+        val, "YYYY-MM-DDTHH:mm:ss.SSS[Z]", tz="UTC"
+    ).in_timezone(timestamps.LOCAL_TZ)
+    assert_same(timestamps.parse_utc(val), expected)
+
+
+def test_from_epoch_round_trips():
+    # stored timestamps are whole seconds
+    for val, fmt in LOCAL:
+        if "SSS" in fmt:
+            continue
+        tee_time = timestamps.parse_local(val)
+        assert_same(timestamps.from_epoch(tee_time.int_timestamp), tee_time)